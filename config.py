@@ -1,32 +1,48 @@
 import os
+from types import MappingProxyType
+
 from dotenv import load_dotenv
 
-# Load .env from project root (same folder as main.py)
-load_dotenv()
+_LOADED = False
+
+
+def _load() -> None:
+    """Load .env from project root (same folder as main.py), at most once."""
+    global _LOADED
+    if not _LOADED:
+        load_dotenv()
+        _LOADED = True
+
+
+_load()
+
+# Read-only snapshot of the environment; settings below are resolved once at
+# import and are plain module attributes afterwards.
+_ENV = MappingProxyType(os.environ.copy())
 
-ENV = os.getenv("ENV", "development")
-DEBUG = os.getenv("DEBUG", "False").lower() == "true"
+ENV = _ENV.get("ENV", "development")
+DEBUG = _ENV.get("DEBUG", "False").lower() == "true"
 
-SECRET_KEY = os.getenv("SECRET_KEY", "nutrivision-dev-secret")
-SESSION_SECRET = os.getenv("SESSION_SECRET", SECRET_KEY)
+SECRET_KEY = _ENV.get("SECRET_KEY", "nutrivision-dev-secret")
+SESSION_SECRET = _ENV.get("SESSION_SECRET", SECRET_KEY)
 
-DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./nutrivision.db")
-DATABASE_PATH = os.getenv("DATABASE_PATH", DATABASE_URL.replace("sqlite:///", "", 1) if DATABASE_URL.startswith("sqlite:///") else "nutrivision.db")
+DATABASE_URL = _ENV.get("DATABASE_URL", "sqlite:///./nutrivision.db")
+DATABASE_PATH = _ENV.get("DATABASE_PATH", DATABASE_URL.replace("sqlite:///", "", 1) if DATABASE_URL.startswith("sqlite:///") else "nutrivision.db")
 
 # API Keys
-GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
-GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.1-8b-instant")
+GROQ_API_KEY = _ENV.get("GROQ_API_KEY", "")
+GROQ_MODEL = _ENV.get("GROQ_MODEL", "llama-3.1-8b-instant")
 
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY", "")
-OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "google/gemma-2-9b-it")
-OPENROUTER_SITE = os.getenv("OPENROUTER_SITE", "http://localhost")
-OPENROUTER_APP = os.getenv("OPENROUTER_APP", "NutriVision")
+OPENROUTER_API_KEY = _ENV.get("OPENROUTER_API_KEY", "")
+OPENROUTER_MODEL = _ENV.get("OPENROUTER_MODEL", "google/gemma-2-9b-it")
+OPENROUTER_SITE = _ENV.get("OPENROUTER_SITE", "http://localhost")
+OPENROUTER_APP = _ENV.get("OPENROUTER_APP", "NutriVision")
 
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY", "")
-USDA_API_KEY = os.getenv("USDA_API_KEY", "DEMO_KEY")
+TAVILY_API_KEY = _ENV.get("TAVILY_API_KEY", "")
+USDA_API_KEY = _ENV.get("USDA_API_KEY", "DEMO_KEY")
 
 # Feature flags
-ENABLE_GROCERY_MODE = os.getenv("ENABLE_GROCERY_MODE", "True").lower() == "true"
-ENABLE_MENU_OCR = os.getenv("ENABLE_MENU_OCR", "True").lower() == "true"
-ENABLE_AI_SIMULATOR = os.getenv("ENABLE_AI_SIMULATOR", "True").lower() == "true"
-ENABLE_WEEKLY_REPORT = os.getenv("ENABLE_WEEKLY_REPORT", "True").lower() == "true"
+ENABLE_GROCERY_MODE = _ENV.get("ENABLE_GROCERY_MODE", "True").lower() == "true"
+ENABLE_MENU_OCR = _ENV.get("ENABLE_MENU_OCR", "True").lower() == "true"
+ENABLE_AI_SIMULATOR = _ENV.get("ENABLE_AI_SIMULATOR", "True").lower() == "true"
+ENABLE_WEEKLY_REPORT = _ENV.get("ENABLE_WEEKLY_REPORT", "True").lower() == "true"
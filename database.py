@@ -1,6 +1,13 @@
+import asyncio
+import json
 import os
+import re
 import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from datetime import date
+from functools import partial
 
 # Use .env / environment variables if present.
 # This keeps Windows + Linux behavior consistent and prevents "profile not saved" bugs
@@ -17,330 +24,636 @@ def _resolve_db_path() -> str:
 
 DATABASE_PATH = _resolve_db_path()
 
-def init_database():
-    """Initialize the database with required tables."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-
-    # Users table (email/password auth)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            email TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # User profiles table (latest row per user is active)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS user_profiles (
-            user_id INTEGER,
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            age INTEGER,
-            gender TEXT,
-            height REAL,
-            weight REAL,
-            conditions TEXT,
-            goals TEXT,
-            activity_level TEXT,
-            calorie_target REAL,
-            protein_target REAL,
-            carb_target REAL,
-            fat_target REAL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # NOTE: do not ALTER user_profiles.user_id; it already exists in the schema above.
-
-    # Food logs table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS food_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER DEFAULT 1,
-            date TEXT,
-            product_name TEXT,
-            calories REAL,
-            protein REAL,
-            carbs REAL,
-            fat REAL,
-            sugar REAL,
-            sodium REAL,
-            fiber REAL,
-            additives_count INTEGER DEFAULT 0,
-            nova_group INTEGER,
-            nutri_score TEXT,
-            score INTEGER,
-            source TEXT DEFAULT 'manual',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    """)
-
-    # Lightweight migration for older DBs
+# Bump whenever SCHEMA_SQL, SCHEMA_INDEXES or _COLUMN_MIGRATIONS change;
+# databases stamped with an older PRAGMA user_version migrate once on startup.
+SCHEMA_VERSION = 7
+
+# Timestamps are stored as INTEGER unix epochs (portable spelling of unixepoch()).
+_EPOCH_NOW = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+# 2440587.5 is the Julian day of 1970-01-01 00:00 UTC.
+_DATE_DAY_COLUMN = "date_day INTEGER GENERATED ALWAYS AS (CAST(julianday(date) - 2440587.5 AS INTEGER)) VIRTUAL"
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def _epoch_day(value: str) -> int | None:
+    """'YYYY-MM-DD' -> days since 1970-01-01 (None for unparsable input)."""
     try:
-        cursor.execute("ALTER TABLE food_logs ADD COLUMN source TEXT DEFAULT 'manual'")
-    except Exception:
-        pass
+        return date.fromisoformat(value).toordinal() - _EPOCH_ORDINAL
+    except (TypeError, ValueError):
+        return None
+
+
+# All tables, run as one script so SQLite parses the DDL in a single call.
+# Older databases only pick up new columns via _COLUMN_MIGRATIONS below.
+SCHEMA_SQL = f"""
+-- Users table (email/password auth)
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    created_at INTEGER DEFAULT ({_EPOCH_NOW})
+);
+
+-- User profiles table (latest row per user is active)
+CREATE TABLE IF NOT EXISTS user_profiles (
+    user_id INTEGER,
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    age INTEGER,
+    gender TEXT,
+    height REAL,
+    weight REAL,
+    conditions TEXT,
+    goals TEXT,
+    activity_level TEXT,
+    calorie_target REAL,
+    protein_target REAL,
+    carb_target REAL,
+    fat_target REAL,
+    created_at INTEGER DEFAULT ({_EPOCH_NOW})
+);
+
+-- Food logs table
+CREATE TABLE IF NOT EXISTS food_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER DEFAULT 1,
+    date TEXT,
+    product_name TEXT,
+    calories REAL,
+    protein REAL,
+    carbs REAL,
+    fat REAL,
+    sugar REAL,
+    sodium REAL,
+    fiber REAL,
+    additives_count INTEGER DEFAULT 0,
+    nova_group INTEGER,
+    nutri_score TEXT,
+    score INTEGER,
+    source TEXT DEFAULT 'manual',
+    created_at INTEGER DEFAULT ({_EPOCH_NOW}),
+    date_day INTEGER GENERATED ALWAYS AS (CAST(julianday(date) - 2440587.5 AS INTEGER)) VIRTUAL,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+-- Water logs table (separate from food logs for clean tracking)
+CREATE TABLE IF NOT EXISTS water_logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER DEFAULT 1,
+    date TEXT,
+    amount_ml INTEGER,
+    created_at INTEGER DEFAULT ({_EPOCH_NOW}),
+    date_day INTEGER GENERATED ALWAYS AS (CAST(julianday(date) - 2440587.5 AS INTEGER)) VIRTUAL,
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+
+-- Grocery scan sessions (cart mode)
+CREATE TABLE IF NOT EXISTS grocery_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER,
+    started_at INTEGER DEFAULT ({_EPOCH_NOW}),
+    ended_at INTEGER,
+    title TEXT DEFAULT 'Grocery Session',
+    FOREIGN KEY (user_id) REFERENCES users(id)
+);
+CREATE TABLE IF NOT EXISTS grocery_items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER,
+    barcode TEXT,
+    name TEXT,
+    score INTEGER,
+    nova_group INTEGER,
+    sugar REAL,
+    sodium REAL,
+    created_at INTEGER DEFAULT ({_EPOCH_NOW}),
+    FOREIGN KEY (session_id) REFERENCES grocery_sessions(id)
+);
+
+-- Weekly reports cache (optional)
+CREATE TABLE IF NOT EXISTS weekly_reports (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER,
+    week_start TEXT,
+    pdf_path TEXT,
+    created_at INTEGER DEFAULT ({_EPOCH_NOW})
+);
+
+-- LLM replies keyed by a BLAKE2b-128 digest of the prompt (see services/llm.py)
+CREATE TABLE IF NOT EXISTS llm_cache (
+    prompt_hash BLOB PRIMARY KEY,
+    response TEXT NOT NULL,
+    created_at INTEGER DEFAULT ({_EPOCH_NOW})
+);
+
+-- The caches moved to the in-memory "cache" database (see CACHE_SCHEMA_SQL).
+DROP TABLE IF EXISTS main.products_cache;
+DROP TABLE IF EXISTS main.additive_cache;
+"""
+
+# Indexes reference migrated columns, so they run after _add_missing_columns.
+SCHEMA_INDEXES = (
+    # Per-user/per-day lookups (latest first)
+    "DROP INDEX IF EXISTS idx_food_logs_user_date",
+    "DROP INDEX IF EXISTS idx_water_logs_user_date",
+    "CREATE INDEX IF NOT EXISTS idx_food_logs_user_day ON food_logs(user_id, date_day, created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_water_logs_user_day ON water_logs(user_id, date_day, created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_profiles_user ON user_profiles(user_id, created_at DESC)",
+    "CREATE INDEX IF NOT EXISTS idx_grocery_items_session ON grocery_items(session_id, created_at DESC)",
+    # Emails are stored and looked up normalized; the index enforces that
+    # case/whitespace variants can't register twice.
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email_ci ON users(lower(trim(email)))",
+)
+
 
-    # More lightweight migrations
-    for stmt in [
-        "ALTER TABLE food_logs ADD COLUMN nova_group INTEGER",
-        "ALTER TABLE food_logs ADD COLUMN nutri_score TEXT",
-    ]:
+def init_database():
+    """Initialize the database with required tables (once per schema version)."""
+    with get_db() as conn:
+        # WAL lets readers run alongside a writer; the setting is stored in the
+        # database file, so it only needs to be applied once here.
+        conn.execute("PRAGMA journal_mode=WAL")
+        if _schema_version(conn) >= SCHEMA_VERSION:
+            return
+
+        # Table rebuilds drop parents that children still reference, and this
+        # pragma is a no-op inside a transaction, so flip it before BEGIN.
+        conn.execute("PRAGMA foreign_keys=OFF")
         try:
-            cursor.execute(stmt)
-        except Exception:
-            pass
-
-    # Water logs table (separate from food logs for clean tracking)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS water_logs (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER DEFAULT 1,
-            date TEXT,
-            amount_ml INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    """)
-    
-    # Products cache table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS products_cache (
-            barcode TEXT PRIMARY KEY,
-            name TEXT,
-            brand TEXT,
-            nutri_score TEXT,
-            nova_group INTEGER,
-            eco_score TEXT,
-            calories REAL,
-            protein REAL,
-            carbs REAL,
-            fat REAL,
-            sugar REAL,
-            sodium REAL,
-            fiber REAL,
-            additives TEXT,
-            allergens TEXT,
-            vegan INTEGER,
-            vegetarian INTEGER,
-            cached_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # Additive concerns cache (for Tavily/Groq enrichment)
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS additive_cache (
-            code TEXT PRIMARY KEY,
-            name TEXT,
-            risk TEXT,
-            concerns TEXT,
-            sources_json TEXT,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """
-    )
-    
-    
-    # Grocery scan sessions (cart mode)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS grocery_sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            ended_at TIMESTAMP,
-            title TEXT DEFAULT 'Grocery Session',
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    """)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS grocery_items (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            session_id INTEGER,
-            barcode TEXT,
-            name TEXT,
-            score INTEGER,
-            nova_group INTEGER,
-            sugar REAL,
-            sodium REAL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (session_id) REFERENCES grocery_sessions(id)
-        )
-    """)
-
-    # Weekly reports cache (optional)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS weekly_reports (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            week_start TEXT,
-            pdf_path TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    conn.commit()
-    conn.close()
+            # executescript() commits any pending transaction before it runs, so
+            # the exclusive lock is taken inside the script and stays open below.
+            conn.executescript("BEGIN EXCLUSIVE;" + SCHEMA_SQL)
+            # Another worker may have migrated while we waited for the lock.
+            if _schema_version(conn) < SCHEMA_VERSION:
+                _add_missing_columns(conn)
+                _rebuild_epoch_tables(conn)
+                for stmt in SCHEMA_INDEXES:
+                    conn.execute(stmt)
+                conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+            conn.commit()
+        finally:
+            conn.execute("PRAGMA foreign_keys=ON")
+
+
+def _schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()["user_version"]
+
+
+# Columns added after the original CREATE TABLEs, applied to older databases.
+# date_day is the integer day number (days since 1970-01-01) derived from the
+# TEXT date, so per-day filters compare small integers; as a generated column
+# it stays in sync with every write without touching the insert paths.
+_COLUMN_MIGRATIONS = (
+    ("food_logs", "source", "source TEXT DEFAULT 'manual'"),
+    ("food_logs", "nova_group", "nova_group INTEGER"),
+    ("food_logs", "nutri_score", "nutri_score TEXT"),
+    ("food_logs", "date_day", _DATE_DAY_COLUMN),
+    ("water_logs", "date_day", _DATE_DAY_COLUMN),
+)
+
+
+def _add_missing_columns(conn):
+    existing = {}
+    for table, column, ddl in _COLUMN_MIGRATIONS:
+        if table not in existing:
+            # table_xinfo also lists generated columns, which table_info hides.
+            rows = conn.execute("SELECT name FROM pragma_table_xinfo(?)", (table,))
+            existing[table] = {row["name"] for row in rows}
+        if column not in existing[table]:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {ddl}")
+            existing[table].add(column)
+
+
+# Pure caches live in a process-wide shared in-memory database attached to
+# every connection as "cache": cache writes never touch the WAL or fsync, and
+# losing them on restart only costs a refetch. It survives as long as any
+# thread's connection stays open.
+_CACHE_DB_URI = "file:nutrivision_cache?mode=memory&cache=shared"
+_cache_lock = threading.RLock()
+
+CACHE_SCHEMA_SQL = f"""
+-- Products cache table
+CREATE TABLE IF NOT EXISTS cache.products_cache (
+    barcode TEXT PRIMARY KEY,
+    name TEXT,
+    brand TEXT,
+    nutri_score TEXT,
+    nova_group INTEGER,
+    eco_score TEXT,
+    calories REAL,
+    protein REAL,
+    carbs REAL,
+    fat REAL,
+    sugar REAL,
+    sodium REAL,
+    fiber REAL,
+    additives TEXT,
+    allergens TEXT,
+    vegan INTEGER,
+    vegetarian INTEGER,
+    cached_at INTEGER DEFAULT ({_EPOCH_NOW})
+);
+
+-- Additive concerns cache (for Tavily/Groq enrichment)
+CREATE TABLE IF NOT EXISTS cache.additive_cache (
+    code TEXT PRIMARY KEY,
+    name TEXT,
+    risk TEXT,
+    concerns TEXT,
+    sources_json TEXT,
+    updated_at INTEGER DEFAULT ({_EPOCH_NOW})
+);
+"""
+
+
+# Tables whose timestamp columns moved from ISO text to INTEGER epochs (v6).
+# Changing a column's type or default needs a table rebuild in SQLite.
+_EPOCH_COLUMNS = {
+    "users": ("created_at",),
+    "user_profiles": ("created_at",),
+    "food_logs": ("created_at",),
+    "water_logs": ("created_at",),
+    "grocery_sessions": ("started_at", "ended_at"),
+    "grocery_items": ("created_at",),
+    "weekly_reports": ("created_at",),
+}
+_TABLE_DDL = {
+    name: ddl
+    for ddl, name in re.findall(r"(CREATE TABLE IF NOT EXISTS (\w+) \(.*?\n\));", SCHEMA_SQL, re.S)
+}
+
+
+def _rebuild_epoch_tables(conn):
+    for table, columns in _EPOCH_COLUMNS.items():
+        old = {row["name"]: row for row in conn.execute(
+            "SELECT name, type, hidden FROM pragma_table_xinfo(?)", (table,))}
+        if old[columns[0]]["type"].upper() == "INTEGER":
+            continue
+        # Create-copy-drop-rename, so no other table's REFERENCES get rewritten.
+        ddl = _TABLE_DDL[table].replace(f"IF NOT EXISTS {table} (", f"{table}_new (", 1)
+        conn.execute(ddl)
+        new = {row["name"] for row in conn.execute(
+            "SELECT name FROM pragma_table_xinfo(?) WHERE hidden = 0", (f"{table}_new",))}
+        copy = [name for name, row in old.items() if name in new and not row["hidden"]]
+        select = [
+            f"CASE WHEN typeof({name}) = 'text' THEN CAST(strftime('%s', {name}) AS INTEGER) ELSE {name} END"
+            if name in columns else name
+            for name in copy
+        ]
+        conn.execute(f"INSERT INTO {table}_new ({_cols(copy)}) SELECT {_cols(select)} FROM {table}")
+        conn.execute(f"DROP TABLE {table}")
+        conn.execute(f"ALTER TABLE {table}_new RENAME TO {table}")
+
+
+# One long-lived connection per thread; opening a fresh connection per helper
+# call costs far more than the queries themselves.
+_local = threading.local()
+
+
+# Per-connection settings (SQLite does not persist these in the file).
+# synchronous=NORMAL is safe under WAL and avoids an fsync per commit.
+_CONNECTION_PRAGMAS = (
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+# (description, column names) of the last query seen by _dict_factory. A
+# cursor hands out the same description tuple for every row of a result set,
+# so the names are rebuilt once per query rather than once per row. Swapped
+# as a single tuple, so concurrent pool threads at worst rebuild it.
+_last_columns: tuple = (None, ())
+
+
+def _dict_factory(cursor, row):
+    """Build plain dicts straight from the cursor (no sqlite3.Row + dict() copy)."""
+    global _last_columns
+    description = cursor.description
+    seen, names = _last_columns
+    if seen is not description:
+        names = tuple(col[0] for col in description)
+        _last_columns = (description, names)
+    return dict(zip(names, row))
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(DATABASE_PATH, check_same_thread=False, cached_statements=256, uri=True)
+    conn.row_factory = _dict_factory
+    for pragma in _CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    conn.execute("ATTACH DATABASE ? AS cache", (_CACHE_DB_URI,))
+    # Shared-cache readers skip table read locks instead of failing with
+    # SQLITE_LOCKED (busy_timeout does not apply to shared-cache locks).
+    conn.execute("PRAGMA read_uncommitted=1")
+    with _cache_lock:
+        conn.executescript(CACHE_SCHEMA_SQL)
+    return conn
+
 
 @contextmanager
 def get_db():
-    """Context manager for database connections."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    conn.row_factory = sqlite3.Row
+    """Context manager lending out this thread's persistent connection."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = _local.conn = _connect()
     try:
         yield conn
-    finally:
+    except Exception:
+        # Don't leave a half-written transaction on the shared connection.
+        conn.rollback()
+        raise
+
+
+@contextmanager
+def transaction():
+    """Group several writes into one commit: ``with transaction() as tx: ...``.
+
+    Pass ``conn=tx`` to the write helpers so they join the transaction
+    instead of committing on their own.
+    """
+    with get_db() as conn:
+        yield conn
+        conn.commit()
+
+
+@contextmanager
+def _writer(conn=None):
+    """Join the caller's transaction, or run a one-shot one."""
+    if conn is not None:
+        yield conn
+    else:
+        with transaction() as conn:
+            yield conn
+
+
+@contextmanager
+def _cache_writer():
+    """Run one write against the shared in-memory cache and commit it.
+
+    Shared-cache table locks fail fast instead of waiting, so cache writers
+    queue on a process lock and never join a caller's transaction (holding
+    the lock until someone else's commit). Don't call from inside transaction().
+    """
+    with _cache_lock, transaction() as conn:
+        yield conn
+
+
+# Async handlers await the helpers on a small dedicated pool (what aiosqlite
+# does with its per-connection thread), so queries never block the event loop.
+# Each pool thread keeps its own persistent connection through get_db().
+_db_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("DB_WORKERS", "4")), thread_name_prefix="sqlite"
+)
+
+
+async def run_db(fn, /, *args, **kwargs):
+    """Await a sync helper on the DB pool: ``await run_db(get_user_profile, uid)``."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, partial(fn, *args, **kwargs))
+
+
+def close_db():
+    """Close this thread's connection and the DB pool's (call from shutdown hooks)."""
+    conn = getattr(_local, "conn", None)
+    if conn is not None:
         conn.close()
+        _local.conn = None
+    # Pool threads exit here; their thread-local connections close with them.
+    _db_executor.shutdown(wait=True)
+
+
+# Column projections for the getters. Listing only what callers read keeps
+# row decoding and dict construction proportional to what is actually used.
+# Epoch timestamps are handed back as 'YYYY-MM-DD HH:MM:SS' (UTC) text, the
+# shape the templates slice; ORDER BY uses the table-qualified column so it
+# still sorts (and walks indexes) on the integer.
+def _iso(col: str) -> str:
+    return f"strftime('%Y-%m-%d %H:%M:%S', {col}, 'unixepoch') AS {col}"
+
+
+PROFILE_COLS = (
+    "user_id", "age", "gender", "height", "weight", "conditions", "goals",
+    "activity_level", "calorie_target", "protein_target", "carb_target", "fat_target",
+)
+FOOD_LOG_COLS = (
+    "id", "user_id", "date", "product_name", "calories", "protein", "carbs", "fat",
+    "sugar", "sodium", "fiber", "additives_count", "nova_group", "nutri_score",
+    "score", "source", _iso("created_at"),
+)
+WATER_LOG_COLS = ("id", "user_id", "date", "amount_ml", _iso("created_at"))
+PRODUCT_COLS = (
+    "barcode", "name", "brand", "nutri_score", "nova_group", "eco_score",
+    "calories", "protein", "carbs", "fat", "sugar", "sodium", "fiber",
+    "additives", "allergens", "vegan", "vegetarian",
+)
+ADDITIVE_COLS = ("code", "name", "risk", "concerns", "sources_json")
+USER_COLS = ("id", "email", "password_hash")
+GROCERY_ITEM_COLS = (
+    "id", "session_id", "barcode", "name", "score", "nova_group", "sugar", "sodium", _iso("created_at"),
+)
+
+
+def _cols(cols) -> str:
+    return ", ".join(cols)
+
+
+# SQL used by the helpers below. Keeping the strings at module scope means each
+# one is a single constant object, so the connection's statement cache
+# (see cached_statements in _connect) hits instead of re-preparing.
+SQL_GET_PROFILE = f"SELECT {_cols(PROFILE_COLS)} FROM user_profiles WHERE user_id = ? ORDER BY created_at DESC LIMIT 1"
+SQL_INSERT_PROFILE = """
+    INSERT INTO user_profiles (
+        user_id, age, gender, height, weight, conditions, goals,
+        activity_level, calorie_target, protein_target,
+        carb_target, fat_target
+    ) VALUES (
+        :user_id, :age, :gender, :height, :weight, :conditions, :goals,
+        :activity_level, :calorie_target, :protein_target,
+        :carb_target, :fat_target
+    )
+"""
+# Values for the optional :name parameters; required ones have no entry.
+PROFILE_DEFAULTS = {
+    "conditions": "", "goals": "", "activity_level": "",
+    "calorie_target": 0, "protein_target": 0, "carb_target": 0, "fat_target": 0,
+}
+SQL_GET_FOOD_LOGS_BY_DATE = f"SELECT {_cols(FOOD_LOG_COLS)} FROM food_logs WHERE user_id = ? AND date_day = ? ORDER BY food_logs.created_at DESC"
+SQL_GET_FOOD_LOGS_RECENT = f"SELECT {_cols(FOOD_LOG_COLS)} FROM food_logs WHERE user_id = ? ORDER BY food_logs.created_at DESC LIMIT ?"
+SQL_GET_FOOD_LOGS_SINCE = (
+    f"SELECT {_cols(FOOD_LOG_COLS)} FROM food_logs WHERE user_id = ? AND date_day >= ? "
+    "ORDER BY food_logs.created_at DESC LIMIT 50"
+)
+SQL_INSERT_FOOD_LOG = """
+    INSERT INTO food_logs (
+        user_id, date, product_name, calories, protein, carbs,
+        fat, sugar, sodium, fiber, additives_count, nova_group, nutri_score, score, source
+    ) VALUES (
+        :user_id, :date, :product_name, :calories, :protein, :carbs,
+        :fat, :sugar, :sodium, :fiber, :additives_count, :nova_group, :nutri_score, :score, :source
+    )
+"""
+FOOD_LOG_DEFAULTS = {
+    "user_id": 1, "fiber": 0, "additives_count": 0, "nova_group": None,
+    "nutri_score": None, "score": 0, "source": "manual",
+}
+SQL_INSERT_WATER_LOG = "INSERT INTO water_logs (user_id, date, amount_ml) VALUES (?, ?, ?)"
+SQL_GET_WATER_LOGS_BY_DATE = f"SELECT {_cols(WATER_LOG_COLS)} FROM water_logs WHERE user_id = ? AND date_day = ? ORDER BY water_logs.created_at DESC"
+SQL_GET_WATER_LOGS_RECENT = f"SELECT {_cols(WATER_LOG_COLS)} FROM water_logs WHERE user_id = ? ORDER BY water_logs.created_at DESC LIMIT 50"
+SQL_DAY_TOTALS = """
+    SELECT
+      COALESCE(SUM(calories),0) as calories,
+      COALESCE(SUM(protein),0) as protein,
+      COALESCE(SUM(carbs),0) as carbs,
+      COALESCE(SUM(fat),0) as fat,
+      COALESCE(SUM(sodium),0) as sodium,
+      COALESCE(SUM(sugar),0) as sugar,
+      COALESCE(SUM(additives_count),0) as additives_count,
+      COUNT(CASE WHEN nova_group = 4 THEN 1 END) as nova4_count,
+      COUNT(*) as meals,
+      (SELECT COALESCE(SUM(amount_ml),0) FROM water_logs WHERE user_id=?1 AND date_day=?2) as water_ml
+    FROM food_logs WHERE user_id=?1 AND date_day=?2
+"""
+SQL_GET_PRODUCT = f"SELECT {_cols(PRODUCT_COLS)} FROM cache.products_cache WHERE barcode = ?"
+SQL_UPSERT_PRODUCT = """
+    INSERT INTO cache.products_cache (
+        barcode, name, brand, nutri_score, nova_group, eco_score,
+        calories, protein, carbs, fat, sugar, sodium, fiber,
+        additives, allergens, vegan, vegetarian
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(barcode) DO UPDATE SET
+        name=excluded.name, brand=excluded.brand, nutri_score=excluded.nutri_score,
+        nova_group=excluded.nova_group, eco_score=excluded.eco_score,
+        calories=excluded.calories, protein=excluded.protein, carbs=excluded.carbs,
+        fat=excluded.fat, sugar=excluded.sugar, sodium=excluded.sodium, fiber=excluded.fiber,
+        additives=excluded.additives, allergens=excluded.allergens,
+        vegan=excluded.vegan, vegetarian=excluded.vegetarian,
+        cached_at=excluded.cached_at
+"""
+SQL_GET_ADDITIVE = f"SELECT {_cols(ADDITIVE_COLS)} FROM cache.additive_cache WHERE code = ?"
+# One statement for any number of codes: the codes are bound as a JSON array.
+SQL_GET_ADDITIVES = f"SELECT {_cols(ADDITIVE_COLS)} FROM cache.additive_cache WHERE code IN (SELECT value FROM json_each(?))"
+SQL_UPSERT_ADDITIVE = """
+    INSERT INTO cache.additive_cache (code, name, risk, concerns, sources_json)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(code) DO UPDATE SET
+        name=excluded.name, risk=excluded.risk, concerns=excluded.concerns,
+        sources_json=excluded.sources_json, updated_at=excluded.updated_at
+"""
+SQL_GET_LLM_REPLY = f"SELECT response FROM llm_cache WHERE prompt_hash = ? AND created_at > {_EPOCH_NOW} - ?"
+SQL_UPSERT_LLM_REPLY = """
+    INSERT INTO llm_cache (prompt_hash, response) VALUES (?, ?)
+    ON CONFLICT(prompt_hash) DO UPDATE SET
+        response=excluded.response, created_at=excluded.created_at
+"""
+SQL_INSERT_USER = "INSERT INTO users (email, password_hash) VALUES (lower(trim(?)), ?)"
+SQL_GET_USER_BY_EMAIL = f"SELECT {_cols(USER_COLS)} FROM users WHERE lower(trim(email)) = lower(trim(?))"
+SQL_GET_USER_BY_ID = f"SELECT {_cols(USER_COLS)} FROM users WHERE id = ?"
+SQL_INSERT_GROCERY_SESSION = "INSERT INTO grocery_sessions(user_id, title) VALUES (?,?)"
+SQL_INSERT_GROCERY_ITEM = """INSERT INTO grocery_items(session_id, barcode, name, score, nova_group, sugar, sodium)
+               VALUES (?,?,?,?,?,?,?)"""
+SQL_GET_GROCERY_ITEMS = f"SELECT {_cols(GROCERY_ITEM_COLS)} FROM grocery_items WHERE session_id=? ORDER BY grocery_items.created_at DESC"
+SQL_END_GROCERY_SESSION = f"UPDATE grocery_sessions SET ended_at={_EPOCH_NOW} WHERE id=?"
+
+# Rows per executemany() call for the bulk helpers.
+_BATCH_SIZE = 100
+
+
+def _executemany_chunked(conn, sql, rows):
+    for i in range(0, len(rows), _BATCH_SIZE):
+        conn.executemany(sql, rows[i:i + _BATCH_SIZE])
 
 
 def get_user_profile(user_id: int):
     """Get latest user profile for a given auth user_id."""
     with get_db() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT * FROM user_profiles WHERE user_id = ? ORDER BY created_at DESC LIMIT 1",
-            (user_id,),
-        )
-        row = cur.fetchone()
-        return dict(row) if row else None
+        return conn.execute(SQL_GET_PROFILE, (user_id,)).fetchone()
 
 
-def save_user_profile(data, user_id=None):
+def save_user_profile(data, user_id=None, *, conn=None):
     """Save or update user profile."""
-    with get_db() as conn:
-        cursor = conn.cursor()
+    with _writer(conn) as conn:
         uid = int(user_id or data.get("user_id") or 1)
-        cursor.execute("""
-            INSERT INTO user_profiles (
-                user_id, age, gender, height, weight, conditions, goals, 
-                activity_level, calorie_target, protein_target, 
-                carb_target, fat_target
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            uid,
-            data['age'], data['gender'], data['height'], data['weight'],
-            data.get('conditions', ''), data.get('goals', ''), data.get('activity_level', ''),
-            data.get('calorie_target', 0), data.get('protein_target', 0),
-            data.get('carb_target', 0), data.get('fat_target', 0)
-        ))
-        conn.commit()
-        return cursor.lastrowid
+        params = {**PROFILE_DEFAULTS, **data, "user_id": uid}
+        return conn.execute(SQL_INSERT_PROFILE, params).lastrowid
 
-def get_food_logs(user_id=1, date=None):
-    """Get food logs for a user, optionally filtered by date."""
+def get_food_logs(user_id=1, date=None, limit=50):
+    """Get food logs for a user: one date's, or the ``limit`` most recent."""
     with get_db() as conn:
-        cursor = conn.cursor()
         if date:
-            cursor.execute(
-                "SELECT * FROM food_logs WHERE user_id = ? AND date = ? ORDER BY created_at DESC",
-                (user_id, date)
-            )
+            cursor = conn.execute(SQL_GET_FOOD_LOGS_BY_DATE, (user_id, _epoch_day(date)))
         else:
-            cursor.execute(
-                "SELECT * FROM food_logs WHERE user_id = ? ORDER BY created_at DESC LIMIT 50",
-                (user_id,)
-            )
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
-
-def save_food_log(data):
+            cursor = conn.execute(SQL_GET_FOOD_LOGS_RECENT, (user_id, limit))
+        return cursor.fetchall()
+
+
+def _food_log_row(data):
+    return {**FOOD_LOG_DEFAULTS, **data}
+
+
+def save_food_log(data, *, conn=None):
     """Save a food log entry."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO food_logs (
-                user_id, date, product_name, calories, protein, carbs, 
-                fat, sugar, sodium, fiber, additives_count, nova_group, nutri_score, score, source
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
-            data.get('user_id', 1), data['date'], data['product_name'],
-            data['calories'], data['protein'], data['carbs'], data['fat'],
-            data['sugar'], data['sodium'], data.get('fiber', 0),
-            data.get('additives_count', 0), data.get('nova_group'), data.get('nutri_score'),
-            data.get('score', 0), data.get('source', 'manual')
-        ))
-        conn.commit()
-        return cursor.lastrowid
+    with _writer(conn) as conn:
+        return conn.execute(SQL_INSERT_FOOD_LOG, _food_log_row(data)).lastrowid
 
 
-def save_water_log(user_id: int, date: str, amount_ml: int) -> int:
+def save_food_logs_bulk(rows, *, conn=None):
+    """Save many food log entries with a single commit."""
+    params = [_food_log_row(data) for data in rows]
+    if not params:
+        return
+    with _writer(conn) as conn:
+        _executemany_chunked(conn, SQL_INSERT_FOOD_LOG, params)
+
+
+def save_water_log(user_id: int, date: str, amount_ml: int, *, conn=None) -> int:
     """Save water intake log."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute(
-            "INSERT INTO water_logs (user_id, date, amount_ml) VALUES (?, ?, ?)",
-            (user_id, date, amount_ml),
-        )
-        conn.commit()
-        return cursor.lastrowid
+    with _writer(conn) as conn:
+        return conn.execute(SQL_INSERT_WATER_LOG, (user_id, date, amount_ml)).lastrowid
 
 
 def get_water_logs(user_id: int = 1, date: str | None = None):
     """Get water logs; by date or recent."""
     with get_db() as conn:
-        cursor = conn.cursor()
         if date:
-            cursor.execute(
-                "SELECT * FROM water_logs WHERE user_id = ? AND date = ? ORDER BY created_at DESC",
-                (user_id, date),
-            )
+            cursor = conn.execute(SQL_GET_WATER_LOGS_BY_DATE, (user_id, _epoch_day(date)))
         else:
-            cursor.execute(
-                "SELECT * FROM water_logs WHERE user_id = ? ORDER BY created_at DESC LIMIT 50",
-                (user_id,),
-            )
-        rows = cursor.fetchall()
-        return [dict(r) for r in rows]
+            cursor = conn.execute(SQL_GET_WATER_LOGS_RECENT, (user_id,))
+        return cursor.fetchall()
 
 
 def get_day_totals(user_id: int, date: str) -> dict:
     """Compute totals for calories/macros + water for a day."""
     with get_db() as conn:
-        c = conn.cursor()
-        c.execute(
-            """
-            SELECT 
-              COALESCE(SUM(calories),0) as calories,
-              COALESCE(SUM(protein),0) as protein,
-              COALESCE(SUM(carbs),0) as carbs,
-              COALESCE(SUM(fat),0) as fat
-            FROM food_logs WHERE user_id=? AND date=?
-            """,
-            (user_id, date),
-        )
-        food = dict(c.fetchone())
-        c.execute(
-            "SELECT COALESCE(SUM(amount_ml),0) as water_ml FROM water_logs WHERE user_id=? AND date=?",
-            (user_id, date),
-        )
-        water = dict(c.fetchone())
-        return {**food, **water}
+        return conn.execute(SQL_DAY_TOTALS, (user_id, _epoch_day(date))).fetchone()
+
+def get_dashboard_bundle(user_id: int, date: str, days: int = 7) -> dict:
+    """Everything /dashboard reads, in one helper call on one connection.
+
+    Returns ``totals`` (SQL_DAY_TOTALS for ``date``), ``logs`` (that day's
+    food logs) and ``logs_week`` (up to 50 logs from the ``days`` days ending
+    on ``date``).
+    """
+    day = _epoch_day(date)
+    with get_db() as conn:
+        return {
+            "totals": conn.execute(SQL_DAY_TOTALS, (user_id, day)).fetchone(),
+            "logs": conn.execute(SQL_GET_FOOD_LOGS_BY_DATE, (user_id, day)).fetchall(),
+            "logs_week": conn.execute(
+                SQL_GET_FOOD_LOGS_SINCE, (user_id, None if day is None else day - days + 1)
+            ).fetchall(),
+        }
 
 def get_cached_product(barcode):
     """Get product from cache."""
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM products_cache WHERE barcode = ?", (barcode,))
-        row = cursor.fetchone()
-        if row:
-            return dict(row)
-    return None
+        return conn.execute(SQL_GET_PRODUCT, (barcode,)).fetchone()
 
 def cache_product(barcode, data):
     """Cache product data."""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT OR REPLACE INTO products_cache (
-                barcode, name, brand, nutri_score, nova_group, eco_score,
-                calories, protein, carbs, fat, sugar, sodium, fiber,
-                additives, allergens, vegan, vegetarian
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """, (
+    with _cache_writer() as conn:
+        conn.execute(SQL_UPSERT_PRODUCT, (
             barcode, data.get('name'), data.get('brand'),
             data.get('nutri_score'), data.get('nova_group'), data.get('eco_score'),
             data.get('calories'), data.get('protein'), data.get('carbs'),
@@ -348,86 +661,103 @@ def cache_product(barcode, data):
             data.get('fiber'), data.get('additives'), data.get('allergens'),
             data.get('vegan', 0), data.get('vegetarian', 0)
         ))
-        conn.commit()
 
 
 def get_cached_additive(code: str):
     with get_db() as conn:
-        c = conn.cursor()
-        c.execute("SELECT * FROM additive_cache WHERE code = ?", (code.upper(),))
-        row = c.fetchone()
-        return dict(row) if row else None
+        return conn.execute(SQL_GET_ADDITIVE, (code.upper(),)).fetchone()
 
 
-def cache_additive(code: str, name: str, risk: str, concerns: str, sources_json: str):
+def get_cached_additives(codes) -> dict:
+    """Cached rows for several additive codes in one query, keyed by upper-case code."""
+    codes = list(dict.fromkeys(c.upper() for c in codes))
+    if not codes:
+        return {}
     with get_db() as conn:
-        c = conn.cursor()
-        c.execute(
-            """
-            INSERT OR REPLACE INTO additive_cache (code, name, risk, concerns, sources_json, updated_at)
-            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """,
-            (code.upper(), name, risk, concerns, sources_json),
-        )
-        conn.commit()
+        return {row["code"]: row for row in conn.execute(SQL_GET_ADDITIVES, (json.dumps(codes),))}
+
+
+def cache_additive(code: str, name: str, risk: str, concerns: str, sources_json: str):
+    with _cache_writer() as conn:
+        conn.execute(SQL_UPSERT_ADDITIVE, (code.upper(), name, risk, concerns, sources_json))
+
 
+def cache_additives(rows):
+    """Upsert many (code, name, risk, concerns, sources_json) rows with one commit."""
+    params = [(code.upper(), name, risk, concerns, sources_json)
+              for code, name, risk, concerns, sources_json in rows]
+    if not params:
+        return
+    with _cache_writer() as conn:
+        _executemany_chunked(conn, SQL_UPSERT_ADDITIVE, params)
 
-def create_user(email: str, password_hash: str) -> int:
+
+def get_llm_reply(prompt_hash: bytes, max_age: int):
+    """Stored LLM reply for a prompt digest if younger than max_age seconds, else None."""
     with get_db() as conn:
-        cur = conn.cursor()
-        cur.execute("INSERT INTO users (email, password_hash) VALUES (?, ?)", (email.lower().strip(), password_hash))
-        conn.commit()
-        return cur.lastrowid
+        row = conn.execute(SQL_GET_LLM_REPLY, (prompt_hash, max_age)).fetchone()
+    return row["response"] if row else None
+
+
+def save_llm_reply(prompt_hash: bytes, response: str, *, conn=None):
+    with _writer(conn) as conn:
+        conn.execute(SQL_UPSERT_LLM_REPLY, (prompt_hash, response))
+
+
+def create_user(email: str, password_hash: str, *, conn=None) -> int:
+    with _writer(conn) as conn:
+        return conn.execute(SQL_INSERT_USER, (email, password_hash)).lastrowid
+
+
+def create_user_with_profile(email: str, password_hash: str, profile_data, *, conn=None) -> int:
+    """Create a user and their first profile in a single commit; returns users.id."""
+    with _writer(conn) as conn:
+        uid = create_user(email, password_hash, conn=conn)
+        save_user_profile(profile_data, uid, conn=conn)
+        return uid
 
 def get_user_by_email(email: str):
     with get_db() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM users WHERE email = ?", (email.lower().strip(),))
-        row = cur.fetchone()
-        return dict(row) if row else None
+        return conn.execute(SQL_GET_USER_BY_EMAIL, (email,)).fetchone()
 
 def get_user_by_id(user_id: int):
     with get_db() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-        row = cur.fetchone()
-        return dict(row) if row else None
+        return conn.execute(SQL_GET_USER_BY_ID, (user_id,)).fetchone()
 
 
-def create_grocery_session(user_id: int, title: str = "Grocery Session") -> int:
-    with get_db() as conn:
-        cur = conn.cursor()
-        cur.execute("INSERT INTO grocery_sessions(user_id, title) VALUES (?,?)", (user_id, title))
-        conn.commit()
-        return cur.lastrowid
+def create_grocery_session(user_id: int, title: str = "Grocery Session", *, conn=None) -> int:
+    with _writer(conn) as conn:
+        return conn.execute(SQL_INSERT_GROCERY_SESSION, (user_id, title)).lastrowid
+
+
+def _grocery_item_row(session_id: int, product: dict, score: int):
+    return (
+        session_id,
+        product.get("barcode") or product.get("code") or "",
+        product.get("name") or product.get("product_name") or "Unknown",
+        int(score or 0),
+        int(product.get("nova_group") or 0),
+        float(product.get("sugar") or 0),
+        float(product.get("sodium") or 0),
+    )
 
-def add_grocery_item(session_id: int, product: dict, score: int):
-    with get_db() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            """INSERT INTO grocery_items(session_id, barcode, name, score, nova_group, sugar, sodium)
-               VALUES (?,?,?,?,?,?,?)""",
-            (
-                session_id,
-                product.get("barcode") or product.get("code") or "",
-                product.get("name") or product.get("product_name") or "Unknown",
-                int(score or 0),
-                int(product.get("nova_group") or product.get("nova_group") or 0),
-                float(product.get("sugar") or 0),
-                float(product.get("sodium") or 0),
-            ),
-        )
-        conn.commit()
+
+def add_grocery_item(session_id: int, product: dict, score: int, *, conn=None):
+    with _writer(conn) as conn:
+        conn.execute(SQL_INSERT_GROCERY_ITEM, _grocery_item_row(session_id, product, score))
+
+def add_grocery_items(session_id: int, products_scores: list[tuple[dict, int]], *, conn=None):
+    """Add several (product, score) pairs to a session with a single commit."""
+    rows = [_grocery_item_row(session_id, p, score) for p, score in products_scores]
+    if not rows:
+        return
+    with _writer(conn) as conn:
+        _executemany_chunked(conn, SQL_INSERT_GROCERY_ITEM, rows)
 
 def get_grocery_items(session_id: int):
     with get_db() as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM grocery_items WHERE session_id=? ORDER BY created_at DESC", (session_id,))
-        rows = cur.fetchall()
-        return [dict(r) for r in rows]
+        return conn.execute(SQL_GET_GROCERY_ITEMS, (session_id,)).fetchall()
 
-def end_grocery_session(session_id: int):
-    with get_db() as conn:
-        cur = conn.cursor()
-        cur.execute("UPDATE grocery_sessions SET ended_at=CURRENT_TIMESTAMP WHERE id=?", (session_id,))
-        conn.commit()
+def end_grocery_session(session_id: int, *, conn=None):
+    with _writer(conn) as conn:
+        conn.execute(SQL_END_GROCERY_SESSION, (session_id,))
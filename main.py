@@ -8,23 +8,35 @@ Practical MVP:
  - Free AI coach (local HF model if available; rule-based fallback)
 """
 
-from fastapi import FastAPI, Request, Form, UploadFile, File
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
+from fastapi import Depends, FastAPI, Request, Form, UploadFile, File
+from fastapi.responses import HTMLResponse, ORJSONResponse, RedirectResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from pydantic import BaseModel
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from string import Template
+import asyncio
+import hashlib
 import uvicorn
 import os
+import tempfile
+import threading
 import json
+import orjson
 from dotenv import load_dotenv
 
 # Load .env early so database + AI keys are available everywhere.
 load_dotenv()
 
-from passlib.context import CryptContext
+import bcrypt
 from starlette.middleware.sessions import SessionMiddleware
 
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+# bcrypt work factor: each +1 doubles hash/verify time on the login path.
+# 10 keeps logins fast on small hosts; raise BCRYPT_ROUNDS on stronger hardware.
+# Existing hashes keep verifying at whatever cost they were created with.
+BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '10'))
 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -32,27 +44,32 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # Import services
 from database import (
     init_database,
+    close_db,
+    run_db,
     get_user_profile,
     save_user_profile,
     get_food_logs,
     save_food_log,
+    save_food_logs_bulk,
     get_cached_product,
     cache_product,
     save_water_log,
     get_water_logs,
     get_day_totals,
+    get_dashboard_bundle,
     create_user,
     get_user_by_email,
     get_user_by_id,
 )
 from services.bmr import calculate_user_targets
 from services.food_api import fetch_product, search_products, get_sample_products
-from services.usda_api import fallback_nutrition_for_name
+from services.usda_api import extract_macros, fallback_nutrition_for_name
+from services.ttl_cache import TTLCache
 from services.scoring import compute_personalized_score
 from services.disease_scores import scores_for_conditions
 from services.additive_engine import classify_additives, detect_harmful_chemicals, get_additive_summary
 from services.microplastics import detect_microplastics_risk
-from services.health_score import calculate_health_score, get_weekly_stats, generate_daily_insight
+from services.health_score import STATS_COLUMNS, calculate_health_score, column_sums, get_weekly_stats, generate_daily_insight
 from services.ai_coach import generate_coach_response
 from services.who_guidelines import day_guideline_warnings
 
@@ -65,7 +82,7 @@ from services.simulator import simulate_daily
 from database import create_grocery_session, add_grocery_item, get_grocery_items, end_grocery_session
 
 # Initialize FastAPI app
-app = FastAPI(title="NutriVision AI", version="1.0.0")
+app = FastAPI(title="NutriVision AI", version="1.0.0", default_response_class=ORJSONResponse)
 # Session cookie signing key. Keep stable across restarts or users will be logged out.
 # Prefer SECRET_KEY in .env, fall back to SESSION_SECRET, then a dev default.
 _session_key = os.getenv("SECRET_KEY") or os.getenv("SESSION_SECRET") or "nutrivision-dev-secret"
@@ -85,16 +102,72 @@ def _require_user(request: Request) -> int | None:
     uid = _uid(request)
     return uid
 
+async def current_profile(request: Request) -> dict | None:
+    """Logged-in user's latest profile, loaded at most once per request.
+
+    Use as ``user_profile: dict | None = Depends(current_profile)``.
+    """
+    if not hasattr(request.state, "profile"):
+        uid = _uid(request)
+        request.state.profile = await run_db(get_user_profile, uid) if uid else None
+    return request.state.profile
+
+# Uploads are read in chunks and rejected once they exceed this many bytes,
+# so an oversized photo never gets fully buffered or handed to OCR/the model.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(8 * 1024 * 1024)))
+_UPLOAD_CHUNK = 64 * 1024
+
+async def _read_upload(upload: UploadFile) -> bytes | None:
+    """Read an upload up to MAX_UPLOAD_BYTES; None means it was too large."""
+    buf = bytearray()
+    while chunk := await upload.read(_UPLOAD_CHUNK):
+        buf.extend(chunk)
+        if len(buf) > MAX_UPLOAD_BYTES:
+            return None
+    return bytes(buf)
+
+def _too_large() -> ORJSONResponse:
+    return ORJSONResponse({"error": "too_large", "max_bytes": MAX_UPLOAD_BYTES}, status_code=413)
+
 def _hash_password(pw: str) -> str:
-    return pwd_context.hash(pw)
+    return bcrypt.hashpw(pw.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
 
 def _verify_password(pw: str, pw_hash: str) -> bool:
+    # Every stored hash is bcrypt (the app never used another scheme); a
+    # malformed one makes checkpw raise, which counts as a failed login.
     try:
-        return pwd_context.verify(pw, pw_hash)
+        return bcrypt.checkpw(pw.encode(), pw_hash.encode())
     except Exception:
         return False
 
-templates = Jinja2Templates(directory=os.path.join(BASE_DIR, "templates"))
+# bcrypt is deliberately slow and releases the GIL, so run it on its own pool
+# instead of stalling the event loop; keeping it off the default executor
+# means slow scans/LLM calls in asyncio.to_thread can't queue ahead of logins.
+_bcrypt_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("BCRYPT_WORKERS", "4")), thread_name_prefix="bcrypt"
+)
+
+async def _hash_password_async(pw: str) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_executor, _hash_password, pw)
+
+async def _verify_password_async(pw: str, pw_hash: str) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_executor, _verify_password, pw, pw_hash)
+
+TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
+if os.getenv("ENV") == "prod":
+    # Compile each template once per process (no mtime checks on render) and
+    # keep compiled bytecode on disk so restarts/other workers skip parsing.
+    _jinja_cache_dir = os.path.join(tempfile.gettempdir(), "nv_jinja_cache")
+    os.makedirs(_jinja_cache_dir, exist_ok=True)
+    templates = Jinja2Templates(env=Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=True,
+        auto_reload=False,
+        cache_size=400,
+        bytecode_cache=FileSystemBytecodeCache(_jinja_cache_dir),
+    ))
+else:
+    templates = Jinja2Templates(directory=TEMPLATES_DIR)
 
 
 def _tpl_ctx(request: Request, *, show_nav: bool, active_tab: str | None = None, **extra):
@@ -107,8 +180,27 @@ def _tpl_ctx(request: Request, *, show_nav: bool, active_tab: str | None = None,
     ctx.update(extra)
     return ctx
 
+def _digest(*parts) -> str:
+    """BLAKE2b-128 hex digest of JSON-serializable parts (dict key order ignored)."""
+    raw = orjson.dumps(parts, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+def _etag(*parts) -> str:
+    """Strong ETag over JSON-serializable parts."""
+    return '"' + _digest(*parts) + '"'
+
+def _not_modified(request: Request, etag: str, cache_control: str) -> Response | None:
+    """304 response when the client already holds this ETag, else None."""
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    return None
+
 def _build_product_analysis(product, user_profile):
-    """Build product analysis with scoring and warnings."""
+    """Build product analysis with scoring and warnings.
+
+    Additive enrichment may call Tavily and the LLM, so async handlers run
+    this in a worker thread.
+    """
     score, warnings, recommendation, breakdown = compute_personalized_score(
         product, user_profile
     )
@@ -130,6 +222,63 @@ def _build_product_analysis(product, user_profile):
         'microplastics': microplastics
     }
 
+# Hot barcodes and USDA name lookups are answered from process memory before
+# SQLite or the network. Callers get shallow copies because some handlers
+# fill missing nutrients into the product dict.
+_product_mem = TTLCache(maxsize=4096, ttl=3600)
+_usda_mem = TTLCache(maxsize=2048, ttl=3600)
+
+
+# Open Food Facts lookups in flight, so concurrent scans of one barcode share a request.
+_product_inflight: dict[str, asyncio.Task] = {}
+
+
+async def _get_product(barcode: str) -> dict | None:
+    """Product for a barcode: memory, then the SQLite cache, then Open Food Facts."""
+    product = _product_mem.get(barcode)
+    if product is None:
+        product = await run_db(get_cached_product, barcode)
+        if product is None:
+            return await _fetch_product(barcode)
+        _product_mem.set(barcode, product)
+    return dict(product)
+
+
+async def _fetch_product(barcode: str) -> dict | None:
+    """Fetch from Open Food Facts and write through both caches (coalesced per barcode)."""
+    task = _product_inflight.get(barcode)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_and_store_product(barcode))
+        _product_inflight[barcode] = task
+        task.add_done_callback(lambda _: _product_inflight.pop(barcode, None))
+    # shield: one client disconnecting must not cancel the fetch for the others.
+    product = await asyncio.shield(task)
+    return dict(product) if product else None
+
+
+async def _fetch_and_store_product(barcode: str) -> dict | None:
+    product = await asyncio.to_thread(fetch_product, barcode)
+    if product:
+        await _store_product(barcode, product)
+    return product
+
+
+async def _store_product(barcode: str, product: dict):
+    """Write a freshly fetched product through both cache layers."""
+    await run_db(cache_product, barcode, product)
+    _product_mem.set(barcode, product)
+
+
+def _usda_nutrition(name: str) -> dict | None:
+    """Memoized fallback_nutrition_for_name; misses aren't cached so USDA hiccups don't stick."""
+    key = (name or "").strip().lower()
+    macros = _usda_mem.get(key)
+    if macros is None:
+        macros = fallback_nutrition_for_name(name)
+        if macros:
+            _usda_mem.set(key, macros)
+    return dict(macros) if macros else macros
+
 static_dir = os.path.join(BASE_DIR, "static")
 os.makedirs(static_dir, exist_ok=True)
 app.mount("/static", StaticFiles(directory=static_dir), name="static")
@@ -139,12 +288,25 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 async def startup_event():
     init_database()
     print("✅ Database initialized")
+    # The landing page has no per-user content; render it once per worker.
+    app.state.landing_html = templates.get_template("index.html").render(
+        _tpl_ctx(None, show_nav=False)
+    ).encode()
+    if os.getenv("PRELOAD_HF") == "1":
+        await asyncio.to_thread(_get_clf)
+        await asyncio.to_thread(get_local_pipe)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    close_db()
+    _bcrypt_executor.shutdown(wait=True)
 
 # Routes
 @app.get("/", response_class=HTMLResponse)
 async def landing_page(request: Request):
     """Landing page."""
-    return templates.TemplateResponse("index.html", _tpl_ctx(request, show_nav=False))
+    return HTMLResponse(app.state.landing_html, headers={"Cache-Control": "public, max-age=300"})
 
 
 @app.get("/login", response_class=HTMLResponse)
@@ -153,13 +315,13 @@ async def login_get(request: Request):
 
 @app.post("/login")
 async def login_post(request: Request, email: str = Form(...), password: str = Form(...)):
-    user = get_user_by_email(email)
-    if not user or not _verify_password(password, user["password_hash"]):
+    user = await run_db(get_user_by_email, email)
+    if not user or not await _verify_password_async(password, user["password_hash"]):
         return templates.TemplateResponse("login.html", _tpl_ctx(request, show_nav=False, title="Sign in", error="Invalid email or password."))
     uid = int(user["id"])
     request.session["uid"] = uid
     # If profile already exists, go straight to dashboard.
-    if get_user_profile(uid):
+    if await run_db(get_user_profile, uid):
         return RedirectResponse("/dashboard", status_code=303)
     return RedirectResponse("/get-started", status_code=303)
 
@@ -169,11 +331,11 @@ async def register_get(request: Request):
 
 @app.post("/register")
 async def register_post(request: Request, email: str = Form(...), password: str = Form(...)):
-    if get_user_by_email(email):
+    if await run_db(get_user_by_email, email):
         return templates.TemplateResponse("register.html", _tpl_ctx(request, show_nav=False, title="Create account", error="Email already registered. Please sign in."))
     if len(password) < 6:
         return templates.TemplateResponse("register.html", _tpl_ctx(request, show_nav=False, title="Create account", error="Password must be at least 6 characters."))
-    uid = int(create_user(email, _hash_password(password)))
+    uid = int(await run_db(create_user, email, await _hash_password_async(password)))
     request.session["uid"] = uid
     return RedirectResponse("/get-started", status_code=303)
 
@@ -226,27 +388,50 @@ async def save_onboarding(
     }
 
     # Save to database (tie profile to logged-in user)
-    save_user_profile(profile_data, uid)
+    await run_db(save_user_profile, profile_data, uid)
     
     # Redirect to dashboard for a smooth flow
     return RedirectResponse(url="/dashboard", status_code=303)
 
+# Ring meter key, consumed field, profile target column (None = water default).
+_PROGRESS_FIELDS = (
+    ('calories', 'calories', 'calorie_target'),
+    ('protein', 'protein', 'protein_target'),
+    ('carbs', 'carbs', 'carb_target'),
+    ('fat', 'fat', 'fat_target'),
+    ('water', 'water_ml', None),
+)
+_WATER_TARGET_ML = 2000  # default 2L/day
+
+def _pct(v, t):
+    """v as a percentage of target t, clamped to 0-100 (0 when there's no target)."""
+    try:
+        t = float(t or 0)
+    except (TypeError, ValueError):
+        return 0
+    return 0 if t <= 0 else max(0, min(100, (v / t) * 100))
+
+# Condition keyword -> dashboard mode, checked in priority order.
+_DASHBOARD_MODES = (
+    ('diabetes', 'diabetes'),
+    ('hypertension', 'hypertension'),
+    ('pcos', 'pcos'),
+)
+
 @app.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request):
+async def dashboard(request: Request, user_profile: dict | None = Depends(current_profile)):
     """Main dashboard page."""
     uid=_require_user(request)
     if not uid:
         return RedirectResponse('/login', status_code=303)
-    user_profile = get_user_profile(uid)
     if not user_profile:
         # Redirect to onboarding if no profile
         return RedirectResponse('/get-started', status_code=303)
     
     today = datetime.now().strftime('%Y-%m-%d')
-    logs = get_food_logs(uid, today)
-    water_logs = get_water_logs(uid, today)
-
-    totals = get_day_totals(uid, today)
+    bundle = await run_db(get_dashboard_bundle, uid, today)
+    logs = bundle['logs']
+    totals = bundle['totals']
     consumed = {
         'calories': float(totals.get('calories', 0) or 0),
         'protein': float(totals.get('protein', 0) or 0),
@@ -256,46 +441,26 @@ async def dashboard(request: Request):
     }
 
     # Progress percentages for ring meters
-    def pct(v, t):
-        try:
-            t = float(t or 0)
-            v = float(v or 0)
-            return 0 if t <= 0 else max(0, min(100, (v / t) * 100))
-        except Exception:
-            return 0
-
     progress = {
-        "calories": pct(consumed['calories'], user_profile.get('calorie_target')),
-        "protein": pct(consumed['protein'], user_profile.get('protein_target')),
-        "carbs": pct(consumed['carbs'], user_profile.get('carb_target')),
-        "fat": pct(consumed['fat'], user_profile.get('fat_target')),
-        "water": pct(consumed['water_ml'], 2000),  # default 2L/day
+        key: _pct(consumed[field], user_profile.get(target) if target else _WATER_TARGET_ML)
+        for key, field, target in _PROGRESS_FIELDS
     }
 
     # Health score uses recent week
-    logs_week = get_food_logs(uid)  # recent logs
-    weekly = get_weekly_stats(logs_week)
-    health_score = calculate_health_score(logs_week, user_profile)
-    insight = generate_daily_insight(logs, user_profile)
+    health_score = calculate_health_score(bundle['logs_week'], user_profile)
+    insight = generate_daily_insight(logs, user_profile, totals)
 
     # Risk exposure index (sugar + sodium + ultra-processed + additives + disease conflicts)
-    risk = compute_daily_risk(logs, user_profile)
+    risk = compute_daily_risk(logs, user_profile, totals)
 
     conds = (user_profile.get('conditions') or '').lower()
-    if 'diabetes' in conds:
-        dashboard_mode = 'diabetes'
-    elif 'hypertension' in conds:
-        dashboard_mode = 'hypertension'
-    elif 'pcos' in conds:
-        dashboard_mode = 'pcos'
-    else:
-        dashboard_mode = 'general'
+    dashboard_mode = next((mode for key, mode in _DASHBOARD_MODES if key in conds), 'general')
 
     # WHO guidance (uses sodium/sugar totals if present)
     who = day_guideline_warnings({
         'calories': consumed['calories'],
-        'sodium': sum(l.get('sodium', 0) for l in logs),
-        'sugar': sum(l.get('sugar', 0) for l in logs),
+        'sodium': float(totals.get('sodium', 0) or 0),
+        'sugar': float(totals.get('sugar', 0) or 0),
     }, float(user_profile.get('calorie_target') or 0))
 
     return templates.TemplateResponse(
@@ -307,7 +472,6 @@ async def dashboard(request: Request):
             user=user_profile,
             consumed=consumed,
             logs=logs[:6],
-            water_logs=water_logs[:6],
             health_score=health_score,
             risk=risk,
             insight=insight,
@@ -318,22 +482,20 @@ async def dashboard(request: Request):
     )
 
 @app.get("/scan", response_class=HTMLResponse)
-async def scan_page(request: Request, barcode: str | None = None):
+async def scan_page(request: Request, barcode: str | None = None, user_profile: dict | None = Depends(current_profile)):
     uid=_require_user(request)
     if not uid:
         return RedirectResponse("/login", status_code=303)
 
-    user_profile = get_user_profile(uid)
     if not user_profile:
         return templates.TemplateResponse("onboarding.html", _tpl_ctx(request, show_nav=False))
 
     product = None
     analysis = None
     if barcode:
-        product = get_cached_product(barcode) or fetch_product(barcode)
+        product = await _get_product(barcode)
         if product:
-            cache_product(barcode, product)
-            analysis = _build_product_analysis(product, user_profile)
+            analysis = await asyncio.to_thread(_build_product_analysis, product, user_profile)
 
     return templates.TemplateResponse(
         "scan.html",
@@ -345,18 +507,17 @@ async def scan_page(request: Request, barcode: str | None = None):
 
 
 @app.get("/grocery", response_class=HTMLResponse)
-async def grocery_page(request: Request, session_id: int | None = None):
+async def grocery_page(request: Request, session_id: int | None = None, user_profile: dict | None = Depends(current_profile)):
     uid=_require_user(request)
     if not uid:
         return RedirectResponse("/login", status_code=303)
-    user_profile = get_user_profile(uid)
     if not user_profile:
         return RedirectResponse("/get-started", status_code=303)
 
     if not session_id:
-        session_id = create_grocery_session(uid, "Grocery Session")
+        session_id = await run_db(create_grocery_session, uid, "Grocery Session")
 
-    items = get_grocery_items(session_id)
+    items = await run_db(get_grocery_items, session_id)
     basket_score = 0
     if items:
         basket_score = round(sum((i.get("score") or 0) for i in items)/len(items))
@@ -366,52 +527,48 @@ async def grocery_page(request: Request, session_id: int | None = None):
         _tpl_ctx(request, show_nav=True, active_tab="scan", user=user_profile, session_id=session_id, items=items, basket_score=basket_score),
     )
 
-@app.post("/api/grocery/add", response_class=JSONResponse)
-async def grocery_add(request: Request, session_id: int = Form(...), barcode: str = Form(...)):
+@app.post("/api/grocery/add", response_class=ORJSONResponse)
+async def grocery_add(request: Request, session_id: int = Form(...), barcode: str = Form(...), user_profile: dict | None = Depends(current_profile)):
     uid=_require_user(request)
     if not uid:
-        return JSONResponse({"ok": False, "error": "auth"}, status_code=401)
-    user_profile = get_user_profile(uid)
-    product = get_cached_product(barcode) or fetch_product(barcode)
+        return ORJSONResponse({"ok": False, "error": "auth"}, status_code=401)
+    product = await _get_product(barcode)
     if not product:
-        return JSONResponse({"ok": False, "error": "not_found"}, status_code=404)
-    cache_product(barcode, product)
-    score, *_ = compute_personalized_score(product, user_profile)
-    add_grocery_item(session_id, product, int(score))
-    return JSONResponse({"ok": True})
+        return ORJSONResponse({"ok": False, "error": "not_found"}, status_code=404)
+    score, *_ = await asyncio.to_thread(compute_personalized_score, product, user_profile)
+    await run_db(add_grocery_item, session_id, product, int(score))
+    return ORJSONResponse({"ok": True})
 
-@app.post("/api/grocery/end", response_class=JSONResponse)
+@app.post("/api/grocery/end", response_class=ORJSONResponse)
 async def grocery_end(request: Request, session_id: int = Form(...)):
     uid=_require_user(request)
     if not uid:
-        return JSONResponse({"ok": False, "error": "auth"}, status_code=401)
-    end_grocery_session(session_id)
-    return JSONResponse({"ok": True})
+        return ORJSONResponse({"ok": False, "error": "auth"}, status_code=401)
+    await run_db(end_grocery_session, session_id)
+    return ORJSONResponse({"ok": True})
 
-@app.get("/api/simulate/{barcode}", response_class=JSONResponse)
-async def api_simulate(request: Request, barcode: str):
+@app.get("/api/simulate/{barcode}", response_class=ORJSONResponse)
+async def api_simulate(request: Request, barcode: str, user_profile: dict | None = Depends(current_profile)):
     uid=_require_user(request)
     if not uid:
-        return JSONResponse({"ok": False, "error": "auth"}, status_code=401)
-    user_profile = get_user_profile(uid)
-    product = get_cached_product(barcode) or fetch_product(barcode)
+        return ORJSONResponse({"ok": False, "error": "auth"}, status_code=401)
+    product = await _get_product(barcode)
     if not product:
-        return JSONResponse({"ok": False, "error": "not_found"}, status_code=404)
+        return ORJSONResponse({"ok": False, "error": "not_found"}, status_code=404)
     sim = simulate_daily(product, {"conditions": user_profile.get("conditions","")}, days=30)
-    return JSONResponse({"ok": True, "simulation": sim})
+    return ORJSONResponse({"ok": True, "simulation": sim})
 
 @app.get("/search", response_class=HTMLResponse)
-async def search_page(request: Request, q: str = ""):
+async def search_page(request: Request, q: str = "", user_profile: dict | None = Depends(current_profile)):
     uid=_require_user(request)
     if not uid:
         return RedirectResponse("/login", status_code=303)
-    user_profile = get_user_profile(uid)
     if not user_profile:
         return RedirectResponse("/get-started", status_code=303)
 
     results = []
     if q.strip():
-        results = search_products(q.strip(), page_size=12)
+        results = await asyncio.to_thread(search_products, q.strip(), page_size=12)
     return templates.TemplateResponse(
         "search.html",
         _tpl_ctx(request, show_nav=True, active_tab="scan", title="Search", q=q, results=results, user=user_profile),
@@ -419,28 +576,26 @@ async def search_page(request: Request, q: str = ""):
 
 
 @app.get("/meal", response_class=HTMLResponse)
-async def meal_page(request: Request):
+async def meal_page(request: Request, user_profile: dict | None = Depends(current_profile)):
     uid=_require_user(request)
     if not uid:
         return RedirectResponse('/login', status_code=303)
-    user_profile = get_user_profile(uid)
     if not user_profile:
         return RedirectResponse(url="/get-started", status_code=303)
     return templates.TemplateResponse("meal.html", {"request": request, "user": user_profile})
 
 
 @app.get("/diary", response_class=HTMLResponse)
-async def diary_page(request: Request, date: str | None = None):
+async def diary_page(request: Request, date: str | None = None, user_profile: dict | None = Depends(current_profile)):
     uid=_require_user(request)
     if not uid:
         return RedirectResponse('/login', status_code=303)
-    user_profile = get_user_profile(uid)
     if not user_profile:
         return RedirectResponse(url="/get-started", status_code=303)
     date = date or datetime.now().strftime('%Y-%m-%d')
-    logs = get_food_logs(uid, date)
-    water = get_water_logs(uid, date)
-    totals = get_day_totals(uid, date)
+    logs = await run_db(get_food_logs, uid, date)
+    water = await run_db(get_water_logs, uid, date)
+    totals = await run_db(get_day_totals, uid, date)
     return templates.TemplateResponse(
         "diary.html",
         _tpl_ctx(
@@ -457,80 +612,74 @@ async def diary_page(request: Request, date: str | None = None):
 
 
 @app.get("/coach", response_class=HTMLResponse)
-async def coach_page(request: Request):
+async def coach_page(request: Request, user_profile: dict | None = Depends(current_profile)):
     uid=_require_user(request)
     if not uid:
         return RedirectResponse('/login', status_code=303)
-    user_profile = get_user_profile(uid)
     if not user_profile:
         return RedirectResponse(url="/get-started", status_code=303)
     return templates.TemplateResponse("coach.html", _tpl_ctx(request, show_nav=True, active_tab="coach", user=user_profile))
 
+_SCAN_CACHE_CONTROL = "private, max-age=60"
+
 @app.get("/api/scan/{barcode}")
-async def scan_barcode(request: Request, barcode: str):
+async def scan_barcode(request: Request, barcode: str, user_profile: dict | None = Depends(current_profile)):
     """Scan product by barcode."""
     uid=_require_user(request)
     if not uid:
-        return JSONResponse({'error':'not_authenticated'}, status_code=401)
-    user_profile = get_user_profile(uid)
+        return ORJSONResponse({'error':'not_authenticated'}, status_code=401)
     
-    # Check cache first
-    product = get_cached_product(barcode)
+    # Memory/SQLite cache first, then Open Food Facts
+    product = await _get_product(barcode)
     
-    # If not in cache, fetch from Open Food Facts
     if not product:
-        product = fetch_product(barcode)
-        if product:
-            cache_product(barcode, product)
-    
-    if not product:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=404,
             content={"error": "Product not found"}
         )
 
-    # USDA fallback if OFF is missing key nutrients
+    # The analysis is a pure function of the product and the profile, so a
+    # repeat scan can be answered with a 304 before any scoring work.
+    etag = _etag(product, user_profile)
+    cached = _not_modified(request, etag, _SCAN_CACHE_CONTROL)
+    if cached is not None:
+        return cached
+
+    # USDA fallback if OFF is missing key nutrients. The additive enrichment
+    # the analysis needs (Tavily/LLM for unknown codes) doesn't depend on the
+    # nutrients, so it is warmed in parallel rather than after the USDA calls.
     if (product.get('calories') in (None, 0, '')) or (product.get('protein') in (None, 0, '')):
-        try:
-            extra = fallback_nutrition_for_name(product.get('name') or '')
-            if extra:
-                for k, v in extra.items():
-                    if product.get(k) in (None, 0, '') and v not in (None, 0, ''):
-                        product[k] = v
-        except Exception:
-            pass
+        lookups = [asyncio.to_thread(_usda_nutrition, product.get('name') or '')]
+        if product.get('additives'):
+            lookups.append(asyncio.to_thread(classify_additives, product['additives']))
+        extra = (await asyncio.gather(*lookups, return_exceptions=True))[0]
+        if extra and not isinstance(extra, BaseException):
+            for k, v in extra.items():
+                if product.get(k) in (None, 0, '') and v not in (None, 0, ''):
+                    product[k] = v
     
-    # Compute personalized score
-    score, warnings, recommendation, breakdown = compute_personalized_score(
-        product, user_profile
-    )
+    analysis = await asyncio.to_thread(_build_product_analysis, product, user_profile)
     
-    # Analyze additives
-    additives_data = classify_additives(product.get('additives', ''))
-    additives_summary = get_additive_summary(additives_data)
-    harmful_chemicals = detect_harmful_chemicals(product)
-    microplastics = detect_microplastics_risk(product)
-    
-    return {
-        'product': product,
-        'score': score,
-        'warnings': warnings,
-        'recommendation': recommendation,
-        'breakdown': breakdown,
-        'additives': additives_data,
-        'additives_summary': additives_summary,
-        'harmful_chemicals': harmful_chemicals,
-        'microplastics': microplastics
-    }
+    return ORJSONResponse(
+        {'product': product, **analysis},
+        headers={"ETag": etag, "Cache-Control": _SCAN_CACHE_CONTROL},
+    )
+
+_SEARCH_CACHE_CONTROL = "public, max-age=300"
 
 @app.get("/api/search")
-async def search_food(q: str):
+async def search_food(request: Request, q: str):
     """Search for products."""
-    products = search_products(q)
+    products = await asyncio.to_thread(search_products, q)
     if not products:
         # Return sample products if search fails
         products = get_sample_products()
-    return {'products': products[:10]}
+    payload = {'products': products[:10]}
+    etag = _etag(payload)
+    cached = _not_modified(request, etag, _SEARCH_CACHE_CONTROL)
+    if cached is not None:
+        return cached
+    return ORJSONResponse(payload, headers={"ETag": etag, "Cache-Control": _SEARCH_CACHE_CONTROL})
 
 
 @app.post("/api/photo-label")
@@ -541,10 +690,10 @@ We map that label into USDA FoodData Central search to get macros.
 """
     label = (label or "").strip()
     if not label:
-        return JSONResponse(status_code=400, content={"error": "Missing label"})
+        return ORJSONResponse(status_code=400, content={"error": "Missing label"})
     macros = None
     try:
-        macros = fallback_nutrition_for_name(label)
+        macros = await asyncio.to_thread(_usda_nutrition, label)
     except Exception:
         macros = None
     if not macros:
@@ -571,7 +720,7 @@ async def log_food(
     """Log a food entry."""
     uid=_require_user(request)
     if not uid:
-        return JSONResponse({'error':'not_authenticated'}, status_code=401)
+        return ORJSONResponse({'error':'not_authenticated'}, status_code=401)
     
     log_data = {
         'user_id': uid,
@@ -591,33 +740,104 @@ async def log_food(
         'source': source,
     }
     
-    log_id = save_food_log(log_data)
+    log_id = await run_db(save_food_log, log_data)
     
     return RedirectResponse(url="/dashboard", status_code=303)
 
 
+class FoodLogIn(BaseModel):
+    """One entry for /api/log-food/bulk; same fields and defaults as the /api/log-food form."""
+    product_name: str
+    calories: float
+    protein: float = 0
+    carbs: float = 0
+    fat: float = 0
+    sugar: float = 0
+    sodium: float = 0
+    fiber: float = 0
+    additives_count: int = 0
+    nova_group: int | None = None
+    nutri_score: str = ''
+    score: int = 0
+    source: str = 'manual'
+
+
+MAX_BULK_LOGS = 100
+
+
+@app.post("/api/log-food/bulk")
+async def log_food_bulk(request: Request, entries: list[FoodLogIn]):
+    """Log several food entries (e.g. a whole day) in one transaction."""
+    uid=_require_user(request)
+    if not uid:
+        return ORJSONResponse({'error':'not_authenticated'}, status_code=401)
+    if len(entries) > MAX_BULK_LOGS:
+        return ORJSONResponse({'error': 'too_many', 'max': MAX_BULK_LOGS}, status_code=400)
+    today = datetime.now().strftime('%Y-%m-%d')
+    rows = [{**e.model_dump(), 'user_id': uid, 'date': today} for e in entries]
+    await run_db(save_food_logs_bulk, rows)
+    return {'ok': True, 'count': len(rows)}
+
+
 @app.post("/api/log-water")
 async def log_water(request: Request, amount_ml: int = Form(...)):
     """Log water intake."""
     uid=_require_user(request)
     if not uid:
-        return JSONResponse({'error':'not_authenticated'}, status_code=401)
-    save_water_log(uid, datetime.now().strftime('%Y-%m-%d'), int(amount_ml))
+        return ORJSONResponse({'error':'not_authenticated'}, status_code=401)
+    await run_db(save_water_log, uid, datetime.now().strftime('%Y-%m-%d'), int(amount_ml))
     return RedirectResponse(url="/dashboard", status_code=303)
 
 
 @app.post("/api/chat")
-async def chat(request: Request, message: str = Form(...)):
+async def chat(request: Request, message: str = Form(...), profile: dict | None = Depends(current_profile)):
     """AI coach chat endpoint."""
     uid=_require_user(request)
     if not uid:
-        return JSONResponse({'error':'not_authenticated'}, status_code=401)
-    profile = get_user_profile(uid) or {}
-    recent = get_food_logs(uid)
-    reply = generate_coach_response(profile, recent, message)
+        return ORJSONResponse({'error':'not_authenticated'}, status_code=401)
+    profile = profile or {}
+    recent = await run_db(get_food_logs, uid)
+    reply = await asyncio.to_thread(generate_coach_response, profile, recent, message)
     return {"reply": reply}
 
 
+# Local HF food classifier, built once per process on first use (loading the
+# weights takes seconds). Stays None when transformers/the model is unavailable.
+_clf = None
+_clf_loaded = False
+_clf_lock = threading.Lock()
+
+
+def _load_clf():
+    # Prefer an int8 ONNX export of the food model (see README) when
+    # HF_FOOD_ONNX_DIR points at one; fall back to the PyTorch pipeline.
+    from transformers import pipeline
+    onnx_dir = os.getenv("HF_FOOD_ONNX_DIR")
+    if onnx_dir:
+        try:
+            from optimum.onnxruntime import ORTModelForImageClassification
+            from transformers import AutoImageProcessor
+            model = ORTModelForImageClassification.from_pretrained(onnx_dir)
+            return pipeline("image-classification", model=model,
+                            image_processor=AutoImageProcessor.from_pretrained(onnx_dir))
+        except Exception:
+            pass
+    return pipeline("image-classification", model=os.getenv("HF_FOOD_MODEL", "nateraw/food"))
+
+def _get_clf():
+    global _clf, _clf_loaded
+    if not _clf_loaded:
+        with _clf_lock:
+            if not _clf_loaded:
+                try:
+                    _clf = _load_clf()
+                except Exception:
+                    # If transformers not available, keep unknown
+                    _clf = None
+                _clf_loaded = True
+    return _clf
+
+
 @app.post("/api/meal/analyze")
 async def meal_analyze(request: Request, image: UploadFile = File(...)):
     """Photo meal scan.
@@ -629,32 +849,36 @@ async def meal_analyze(request: Request, image: UploadFile = File(...)):
     """
     uid=_require_user(request)
     if not uid:
-        return JSONResponse({'error':'not_authenticated'}, status_code=401)
+        return ORJSONResponse({'error':'not_authenticated'}, status_code=401)
     
-    content = await image.read()
+    content = await _read_upload(image)
+    if content is None:
+        return _too_large()
     label = "unknown"
     confidence = 0.0
     try:
         from PIL import Image
         import io
-        img = Image.open(io.BytesIO(content)).convert("RGB")
-        try:
-            from transformers import pipeline
-            clf = pipeline("image-classification", model=os.getenv("HF_FOOD_MODEL", "nateraw/food"))
-            out = clf(img)
+        img = Image.open(io.BytesIO(content))
+        # The classifier resizes to ~224px anyway; shrinking first (draft lets
+        # JPEG decode at reduced scale) cuts decode and preprocessing work.
+        img.draft("RGB", (384, 384))
+        img = img.convert("RGB")
+        img.thumbnail((384, 384))
+        # Model load (first call) and inference are CPU-bound; keep them off the loop.
+        clf = await asyncio.to_thread(_get_clf)
+        if clf is not None:
+            out = await asyncio.to_thread(clf, img)
             if out:
                 label = out[0].get("label", "unknown")
                 confidence = float(out[0].get("score", 0.0) or 0.0)
-        except Exception:
-            # If transformers not available, keep unknown
-            pass
     except Exception:
         pass
 
     macros = None
     if label != "unknown":
         try:
-            macros = fallback_nutrition_for_name(label)
+            macros = await asyncio.to_thread(_usda_nutrition, label)
         except Exception:
             macros = None
 
@@ -666,19 +890,19 @@ async def meal_analyze(request: Request, image: UploadFile = File(...)):
     }
 
 @app.get("/api/stats")
-async def get_stats(request: Request):
+async def get_stats(request: Request, user_profile: dict | None = Depends(current_profile)):
     """Get user statistics."""
     uid=_require_user(request)
     if not uid:
-        return JSONResponse({'error':'not_authenticated'}, status_code=401)
-    user_profile = get_user_profile(uid)
-    logs = get_food_logs(uid)
+        return ORJSONResponse({'error':'not_authenticated'}, status_code=401)
+    logs = await run_db(get_food_logs, uid)
     
     if not user_profile:
         return {'error': 'No user profile found'}
     
-    health_score = calculate_health_score(logs, user_profile)
-    weekly_stats = get_weekly_stats(logs)
+    sums = column_sums(logs, STATS_COLUMNS)
+    health_score = calculate_health_score(logs, user_profile, sums)
+    weekly_stats = get_weekly_stats(logs, sums)
     
     return {
         'health_score': health_score,
@@ -693,54 +917,149 @@ async def get_stats(request: Request):
 
 ## NOTE: /api/chat is the single coach endpoint used by the UI.
 
+_SAMPLES_BODY = orjson.dumps({'products': get_sample_products()})
+_SAMPLES_ETAG = _etag(get_sample_products())
+_SAMPLES_CACHE_CONTROL = "public, max-age=3600"
+
 @app.get("/api/sample-products")
-async def get_samples():
+async def get_samples(request: Request):
     """Get sample products for demo."""
-    return {'products': get_sample_products()}
+    cached = _not_modified(request, _SAMPLES_ETAG, _SAMPLES_CACHE_CONTROL)
+    if cached is not None:
+        return cached
+    return Response(
+        _SAMPLES_BODY,
+        media_type="application/json",
+        headers={"ETag": _SAMPLES_ETAG, "Cache-Control": _SAMPLES_CACHE_CONTROL},
+    )
 
 
 @app.get("/menu", response_class=HTMLResponse)
-async def menu_page(request: Request):
+async def menu_page(request: Request, user_profile: dict | None = Depends(current_profile)):
     """Restaurant menu scan (OCR)."""
     uid=_require_user(request)
     if not uid:
         return RedirectResponse('/login', status_code=303)
-    user_profile = get_user_profile(uid)
     if not user_profile:
         return RedirectResponse(url="/get-started", status_code=303)
     return templates.TemplateResponse("menu.html", _tpl_ctx(request, show_nav=True, active_tab="scan", user=user_profile))
 
 
 @app.post("/api/menu/ocr")
-async def menu_ocr(request: Request, image: UploadFile = File(...)):
+async def menu_ocr(request: Request, image: UploadFile = File(...), profile: dict | None = Depends(current_profile)):
     """OCR a menu image and rank items for the user profile."""
     uid=_require_user(request)
     if not uid:
-        return JSONResponse({'error':'not_authenticated'}, status_code=401)
-    profile = get_user_profile(uid) or {}
-    content = await image.read()
-    items = ocr_menu_items(content)
+        return ORJSONResponse({'error':'not_authenticated'}, status_code=401)
+    profile = profile or {}
+    content = await _read_upload(image)
+    if content is None:
+        return _too_large()
+    items = await asyncio.to_thread(ocr_menu_items, content)
     ranked = recommend_menu_items(items, profile)
     return {"items": items, "recommendations": ranked}
 
 
+# Outside static/: reports are per-user and must not be publicly served.
+_REPORT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "nv_reports")
+os.makedirs(_REPORT_CACHE_DIR, exist_ok=True)
+
+def _load_weekly_pdf(uid: int, path: str, profile: dict, logs: list[dict]) -> bytes:
+    """Return the cached report, or build it (reportlab is CPU-bound) and swap
+    it in as this user's only cached report.
+
+    The bytes are read here rather than served by path: a concurrent render
+    for the same user may delete this file as soon as it has replaced it.
+    """
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        pass
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w+b") as f:
+        build_weekly_pdf(profile, logs, sink=f)
+        f.seek(0)
+        data = f.read()
+    os.replace(tmp, path)
+    prefix = f"{uid}-"
+    for name in os.listdir(_REPORT_CACHE_DIR):
+        if name.startswith(prefix) and name.endswith(".pdf") and os.path.join(_REPORT_CACHE_DIR, name) != path:
+            try:
+                os.remove(os.path.join(_REPORT_CACHE_DIR, name))
+            except OSError:
+                pass
+    return data
+
 @app.get("/api/reports/weekly.pdf")
-async def weekly_report_pdf(request: Request):
+async def weekly_report_pdf(request: Request, profile: dict | None = Depends(current_profile)):
     """Download weekly PDF report (no GPT required)."""
     uid=_require_user(request)
     if not uid:
-        return JSONResponse({"error":"not_authenticated"}, status_code=401)
-    profile = get_user_profile(uid) or {}
-    logs = get_food_logs(uid)
-    pdf_bytes = build_weekly_pdf(profile, logs)
+        return ORJSONResponse({"error":"not_authenticated"}, status_code=401)
+    profile = profile or {}
+    logs = await run_db(get_food_logs, uid)
+    # The report only changes with the day, the profile or the logs, so key
+    # the rendered file on exactly those and reuse it until one changes.
+    key = _digest(datetime.now().strftime("%Y-%m-%d"), profile, logs)
+    path = os.path.join(_REPORT_CACHE_DIR, f"{uid}-{key}.pdf")
+    pdf = await asyncio.to_thread(_load_weekly_pdf, uid, path, profile, logs)
     return Response(
-        content=pdf_bytes,
+        pdf,
         media_type="application/pdf",
         headers={"Content-Disposition": "inline; filename=nutrivision-weekly-report.pdf"},
     )
 
 
-from services.llm import answer as llm_answer
+from services.llm import answer as llm_answer, get_local_pipe
+
+# Prompt bodies are fixed; only the profile/log/question slots vary per request.
+_COACH_PROMPT = Template("""You are NutriVision, a careful nutrition coach.
+User profile: $profile
+Recent logs (latest first): $logs
+User question: $message
+
+Rules:
+- Be practical and concise.
+- If user has diabetes/hypertension/etc, give condition-aware guidance.
+- If you mention limits, give a safe conservative range, and say to consult clinician for medical advice.
+Answer:""")
+
+_MEAL_PLAN_PROMPT = Template("""Generate a 1-day meal plan as JSON with keys breakfast,lunch,dinner,snacks.
+Use Nepal-friendly common foods when possible.
+User profile: $profile
+Targets: calories=$calorie_target protein=$protein_target carbs=$carb_target fat=$fat_target
+Constraints: respect conditions/allergies.
+Return ONLY JSON.""")
+
+_WORKOUT_PROMPT = Template("""Create a simple 3-day/week workout routine for the user's goal.
+User profile: $profile
+Return as JSON with keys day1,day2,day3. Include warmup + main + cooldown.
+Return ONLY JSON.""")
+
+# Profile fields a plan depends on (row ids/timestamps would defeat the cache).
+_PLAN_PROFILE_KEYS = (
+    "age", "gender", "height", "weight", "conditions", "goals", "activity_level",
+    "calorie_target", "protein_target", "carb_target", "fat_target",
+)
+
+_plan_mem = TTLCache(1024, 3600)
+
+async def _llm_plan(kind: str, template: Template, profile: dict, fallback_key: str) -> dict:
+    """Generate (or reuse) a JSON plan for the stable subset of a profile."""
+    subset = {k: profile.get(k) for k in _PLAN_PROFILE_KEYS}
+    cache_key = (kind, tuple(subset.values()))
+    plan = _plan_mem.get(cache_key)
+    if plan is not None:
+        return plan
+    prompt = template.substitute(profile=subset, **subset)
+    out = await asyncio.to_thread(llm_answer, prompt)
+    try:
+        plan = json.loads(out)
+    except Exception:
+        return {fallback_key: out}
+    _plan_mem.set(cache_key, plan)
+    return plan
 from services.photo_scan import analyze_photo
 
 @app.post("/api/v1/scan")
@@ -748,11 +1067,10 @@ async def v1_scan(request: Request, barcode: str = Form(...)):
     """Trigger scan + cache; use query param barcode from JS."""
     uid=_require_user(request)
     if not uid:
-        return JSONResponse({"error":"not_authenticated"}, status_code=401)
-    product = fetch_product(barcode)
+        return ORJSONResponse({"error":"not_authenticated"}, status_code=401)
+    product = await _get_product(barcode)
     if not product:
-        return JSONResponse({"found": False}, status_code=404)
-    cache_product(barcode, product)
+        return ORJSONResponse({"found": False}, status_code=404)
     return {"found": True, "barcode": barcode}
 
 @app.post("/api/v1/food-scanner")
@@ -760,14 +1078,17 @@ async def v1_food_scanner(request: Request, file: UploadFile = File(...)):
     """Food photo scanner endpoint."""
     uid=_require_user(request)
     if not uid:
-        return JSONResponse({"error":"not_authenticated"}, status_code=401)
-    image_bytes = await file.read()
-    res = analyze_photo(image_bytes)
+        return ORJSONResponse({"error":"not_authenticated"}, status_code=401)
+    image_bytes = await _read_upload(file)
+    if image_bytes is None:
+        return _too_large()
+    # HF inference and the USDA lookup are blocking HTTP calls.
+    res = await asyncio.to_thread(analyze_photo, image_bytes)
     # map USDA -> macros (best effort)
     macros = {"calories": None, "protein": None, "carbs": None, "fat": None}
     if res.get("usda"):
-        # current usda_api returns a dict already normalized
-        u = res["usda"]
+        # res["usda"] holds FDC search rows; macros come from the best match
+        u = extract_macros(res["usda"][0])
         macros["calories"] = u.get("calories")
         macros["protein"] = u.get("protein")
         macros["carbs"] = u.get("carbs")
@@ -775,69 +1096,56 @@ async def v1_food_scanner(request: Request, file: UploadFile = File(...)):
     return {"label": res["label"], "confidence": res["confidence"], **macros}
 
 @app.post("/api/v1/coach")
-async def v1_coach(request: Request, message: str = Form(...)):
+async def v1_coach(request: Request, message: str = Form(...), profile: dict | None = Depends(current_profile)):
     """V1 coach endpoint."""
     uid=_require_user(request)
     if not uid:
-        return JSONResponse({"error":"not_authenticated"}, status_code=401)
-    profile = get_user_profile(uid) or {}
-    logs = get_food_logs(uid)[:20]
-    prompt = f"""You are NutriVision, a careful nutrition coach.
-User profile: {profile}
-Recent logs (latest first): {logs}
-User question: {message}
-
-Rules:
-- Be practical and concise.
-- If user has diabetes/hypertension/etc, give condition-aware guidance.
-- If you mention limits, give a safe conservative range, and say to consult clinician for medical advice.
-Answer:"""
-    reply = llm_answer(prompt)
+        return ORJSONResponse({"error":"not_authenticated"}, status_code=401)
+    profile = profile or {}
+    logs = await run_db(get_food_logs, uid, limit=20)
+    prompt = _COACH_PROMPT.substitute(profile=profile, logs=logs, message=message)
+    reply = await asyncio.to_thread(llm_answer, prompt)
     return {"reply": reply}
 
 @app.post("/api/v1/meal-planner")
-async def v1_meal_planner(request: Request):
+async def v1_meal_planner(request: Request, profile: dict | None = Depends(current_profile)):
     """Meal planner endpoint."""
     uid=_require_user(request)
     if not uid:
-        return JSONResponse({"error":"not_authenticated"}, status_code=401)
-    profile = get_user_profile(uid) or {}
-    prompt = f"""Generate a 1-day meal plan as JSON with keys breakfast,lunch,dinner,snacks.
-Use Nepal-friendly common foods when possible.
-User profile: {profile}
-Targets: calories={profile.get('calorie_target')} protein={profile.get('protein_target')} carbs={profile.get('carb_target')} fat={profile.get('fat_target')}
-Constraints: respect conditions/allergies.
-Return ONLY JSON."""
-    out = llm_answer(prompt)
-    try:
-        plan = json.loads(out)
-    except Exception:
-        plan = {"breakfast": out}
+        return ORJSONResponse({"error":"not_authenticated"}, status_code=401)
+    profile = profile or {}
+    plan = await _llm_plan("meal", _MEAL_PLAN_PROMPT, profile, "breakfast")
     return {"plan": plan}
 
 @app.post("/api/v1/workout-planner")
-async def v1_workout_planner(request: Request):
+async def v1_workout_planner(request: Request, profile: dict | None = Depends(current_profile)):
     """Workout planner endpoint."""
     uid=_require_user(request)
     if not uid:
-        return JSONResponse({"error":"not_authenticated"}, status_code=401)
-    profile = get_user_profile(uid) or {}
-    prompt = f"""Create a simple 3-day/week workout routine for the user's goal.
-User profile: {profile}
-Return as JSON with keys day1,day2,day3. Include warmup + main + cooldown.
-Return ONLY JSON."""
-    out = llm_answer(prompt)
-    try:
-        plan = json.loads(out)
-    except Exception:
-        plan = {"day1": out}
+        return ORJSONResponse({"error":"not_authenticated"}, status_code=401)
+    profile = profile or {}
+    plan = await _llm_plan("workout", _WORKOUT_PROMPT, profile, "day1")
     return {"plan": plan}
 
 
 # Health check
+_HEALTH_BODY = orjson.dumps({"status": "healthy", "service": "NutriVision AI"})
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy", "service": "NutriVision AI"}
+    return Response(_HEALTH_BODY, media_type="application/json")
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=False)  # Set reload=False for production; True for development with auto-reload on code changes.
\ No newline at end of file
+    # "auto" picks uvloop + httptools when installed (uvicorn[standard]; uvloop
+    # is not available on Windows). Each worker is its own process; startup
+    # (init_database) is safe to run concurrently.
+    uvicorn.run(
+        "main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        loop="auto",
+        http="auto",
+        workers=int(os.getenv("WEB_CONCURRENCY", "4")),
+        access_log=False,
+        reload=False,
+    )
\ No newline at end of file
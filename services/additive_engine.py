@@ -1,6 +1,13 @@
 """Additive analysis and risk classification engine."""
 
-from services.additive_enrich import enrich_additive
+from __future__ import annotations
+
+import re
+from collections import Counter
+from types import MappingProxyType
+from typing import Any, Mapping
+
+from services.additive_enrich import enrich_additives_bulk
 
 # Comprehensive additive database
 ADDITIVE_DATABASE = {
@@ -131,7 +138,18 @@ ADDITIVE_DATABASE = {
     }
 }
 
-def classify_additives(additives_string):
+# Entries are shared by every request: make them read-only so a caller can't
+# mutate the table (classify_additives merges into a fresh dict instead).
+ADDITIVE_DATABASE = MappingProxyType({code: MappingProxyType(entry) for code, entry in ADDITIVE_DATABASE.items()})
+_KNOWN_CODES = frozenset(ADDITIVE_DATABASE)
+
+
+def _needs_enrichment(entry: Mapping[str, Any]) -> bool:
+    concerns = entry.get('health_concerns')
+    return not concerns or concerns == 'Information not available'
+
+
+def classify_additives(additives_string: str | None) -> list[dict[str, Any]]:
     """
     Classify additives and return detailed information.
     
@@ -145,22 +163,33 @@ def classify_additives(additives_string):
         return []
     
     results = []
-    additives_list = [a.strip().upper() for a in str(additives_string).split(',')]
+    # Upper-case once, then split; empty tokens (e.g. "E330,,E322") are skipped.
+    additives_list: list[str] = [a for a in map(str.strip, str(additives_string).upper().split(',')) if a]
+    
+    # Everything that needs Tavily/Groq enrichment is resolved in one batch.
+    to_enrich: list[tuple[str, str, str]] = []
+    for additive in additives_list:
+        if additive not in _KNOWN_CODES:
+            to_enrich.append((additive, '', 'unknown'))
+        else:
+            entry = ADDITIVE_DATABASE[additive]
+            if _needs_enrichment(entry):
+                to_enrich.append((additive, entry.get('name', ''), entry.get('risk', 'unknown')))
+    enriched_by_code = enrich_additives_bulk(to_enrich) if to_enrich else {}
     
     for additive in additives_list:
         # Try to find E-number
-        if additive in ADDITIVE_DATABASE:
-            info = ADDITIVE_DATABASE[additive].copy()
-            info['code'] = additive
+        if additive in _KNOWN_CODES:
+            info = {**ADDITIVE_DATABASE[additive], 'code': additive}
             # Enrich concerns if missing / generic
-            if not info.get('health_concerns') or info.get('health_concerns') == 'Information not available':
-                enriched = enrich_additive(additive, name=info.get('name', ''), risk=info.get('risk', 'unknown'))
+            if _needs_enrichment(info):
+                enriched = enriched_by_code.get(additive, {})
                 info['health_concerns'] = enriched.get('concerns')
                 info['sources'] = enriched.get('sources', [])
             results.append(info)
         else:
             # Unknown additive -> optional Tavily/Groq enrichment
-            enriched = enrich_additive(additive)
+            enriched = enriched_by_code.get(additive, {})
             results.append({
                 'code': additive,
                 'name': additive,
@@ -174,7 +203,10 @@ def classify_additives(additives_string):
     
     return results
 
-def calculate_additive_penalty(additives_data):
+# Per-additive penalty by risk level; anything else (e.g. 'low') adds nothing.
+_RISK_PENALTY = {'high': 10, 'medium': 5, 'unknown': 2}
+
+def calculate_additive_penalty(additives_data: list[dict[str, Any]]) -> int:
     """
     Calculate penalty score based on additives.
     
@@ -184,20 +216,11 @@ def calculate_additive_penalty(additives_data):
     Returns:
         Penalty score (0-30)
     """
-    penalty = 0
-    
-    for additive in additives_data:
-        risk = additive.get('risk', 'unknown')
-        if risk == 'high':
-            penalty += 10
-        elif risk == 'medium':
-            penalty += 5
-        elif risk == 'unknown':
-            penalty += 2
+    penalty = sum(_RISK_PENALTY.get(a.get('risk', 'unknown'), 0) for a in additives_data)
     
     return min(penalty, 30)  # Cap at 30
 
-def get_additive_summary(additives_data):
+def get_additive_summary(additives_data: list[dict[str, Any]]) -> dict[str, Any]:
     """
     Generate a summary of additive risks.
     
@@ -207,10 +230,11 @@ def get_additive_summary(additives_data):
     Returns:
         Dictionary with summary statistics
     """
-    high_risk = sum(1 for a in additives_data if a.get('risk') == 'high')
-    medium_risk = sum(1 for a in additives_data if a.get('risk') == 'medium')
-    low_risk = sum(1 for a in additives_data if a.get('risk') == 'low')
-    unknown = sum(1 for a in additives_data if a.get('risk') == 'unknown')
+    risks = Counter(a.get('risk') for a in additives_data)
+    high_risk = risks['high']
+    medium_risk = risks['medium']
+    low_risk = risks['low']
+    unknown = risks['unknown']
     
     return {
         'total_count': len(additives_data),
@@ -221,7 +245,36 @@ def get_additive_summary(additives_data):
         'has_concerns': high_risk > 0 or medium_risk > 0
     }
 
-def detect_harmful_chemicals(product):
+def _sweetener(name: str) -> dict[str, str]:
+    return {
+        'type': 'Artificial Sweetener',
+        'name': name.title(),
+        'concern': 'May affect gut bacteria and glucose metabolism'
+    }
+
+# (ingredient substrings, warning), in the order warnings are reported.
+_HARMFUL_RULES = (
+    *(((name,), _sweetener(name)) for name in ('aspartame', 'sucralose', 'acesulfame', 'saccharin')),
+    (('palm oil', 'palm fat'), {
+        'type': 'Palm Oil',
+        'name': 'Palm Oil',
+        'concern': 'Environmental concerns, high in saturated fat'
+    }),
+    (('partially hydrogenated',), {
+        'type': 'Trans Fat',
+        'name': 'Partially Hydrogenated Oil',
+        'concern': 'Trans fats increase bad cholesterol and heart disease risk'
+    }),
+    (('high fructose corn syrup', 'glucose-fructose'), {
+        'type': 'Sweetener',
+        'name': 'High Fructose Corn Syrup',
+        'concern': 'Linked to obesity, diabetes, and metabolic syndrome'
+    }),
+)
+_HARMFUL_PATTERN_RULE = {pattern: i for i, (patterns, _) in enumerate(_HARMFUL_RULES) for pattern in patterns}
+_HARMFUL_RE = re.compile('|'.join(map(re.escape, sorted(_HARMFUL_PATTERN_RULE, key=len, reverse=True))))
+
+def detect_harmful_chemicals(product: dict[str, Any]) -> list[dict[str, str]]:
     """
     Detect other harmful chemicals beyond E-numbers.
     
@@ -231,42 +284,12 @@ def detect_harmful_chemicals(product):
     Returns:
         List of harmful chemical warnings
     """
-    warnings = []
-    
-    # Check for artificial sweeteners
-    ingredients = product.get('ingredients_text', '').lower()
-    
-    sweeteners = ['aspartame', 'sucralose', 'acesulfame', 'saccharin']
-    for sweetener in sweeteners:
-        if sweetener in ingredients:
-            warnings.append({
-                'type': 'Artificial Sweetener',
-                'name': sweetener.title(),
-                'concern': 'May affect gut bacteria and glucose metabolism'
-            })
-    
-    # Check for palm oil
-    if 'palm oil' in ingredients or 'palm fat' in ingredients:
-        warnings.append({
-            'type': 'Palm Oil',
-            'name': 'Palm Oil',
-            'concern': 'Environmental concerns, high in saturated fat'
-        })
-    
-    # Check for trans fats
-    if 'partially hydrogenated' in ingredients:
-        warnings.append({
-            'type': 'Trans Fat',
-            'name': 'Partially Hydrogenated Oil',
-            'concern': 'Trans fats increase bad cholesterol and heart disease risk'
-        })
+    ingredients = (product.get('ingredients_text') or '').lower()
+    if not ingredients:
+        return []
     
-    # Check for high fructose corn syrup
-    if 'high fructose corn syrup' in ingredients or 'glucose-fructose' in ingredients:
-        warnings.append({
-            'type': 'Sweetener',
-            'name': 'High Fructose Corn Syrup',
-            'concern': 'Linked to obesity, diabetes, and metabolic syndrome'
-        })
+    # One regex pass finds every pattern; warnings keep the rule table's order.
+    found = {_HARMFUL_PATTERN_RULE[m.group(0)] for m in _HARMFUL_RE.finditer(ingredients)}
+    warnings = [dict(_HARMFUL_RULES[i][1]) for i in sorted(found)]
     
     return warnings
@@ -4,38 +4,47 @@ Flow:
 1) Look in SQLite additive_cache.
 2) If missing and keys exist, Tavily search for reputable sources.
 3) Use Groq (or local fallback) to summarize concerns in short bullets.
+
+enrich_additives_bulk does the same for a whole product: one cache query,
+concurrent Tavily searches and a single LLM prompt for every miss.
 """
 
 from __future__ import annotations
 
-import json
+import orjson
+from concurrent.futures import ThreadPoolExecutor
 
-from database import get_cached_additive, cache_additive
+from database import cache_additive, cache_additives, get_cached_additive, get_cached_additives
 from services.tavily_search import tavily_search
-from services.llm import answer
+from services.llm import FALLBACK_REPLY, answer, answer_json_object
 
 
-def enrich_additive(code: str, *, name: str = "", risk: str = "unknown") -> dict:
-    code_u = (code or "").upper()
-    if not code_u:
-        return {"concerns": "Information not available", "sources": []}
+_NO_INFO = {"concerns": "Information not available", "sources": []}
+_NO_TAVILY = "Information not available (configure TAVILY_API_KEY for sourced concerns)."
+_SEARCH_WORKERS = 8
+
+
+def _dumps(obj) -> str:
+    # sources_json is a TEXT column; orjson returns bytes.
+    return orjson.dumps(obj).decode()
 
-    cached = get_cached_additive(code_u)
-    if cached and cached.get("concerns"):
-        try:
-            sources = json.loads(cached.get("sources_json") or "[]")
-        except Exception:
-            sources = []
-        return {"concerns": cached.get("concerns"), "sources": sources}
 
-    # Query
+def _from_cache(cached) -> dict | None:
+    if not (cached and cached.get("concerns")):
+        return None
+    try:
+        sources = orjson.loads(cached.get("sources_json") or "[]")
+    except Exception:
+        sources = []
+    return {"concerns": cached.get("concerns"), "sources": sources}
+
+
+def _search(code_u: str, name: str) -> list[dict]:
     q = f"{code_u} {name} food additive health concerns EFSA FDA"
-    results = tavily_search(q, max_results=5)
+    return tavily_search(q, max_results=5)
 
-    # If Tavily isn't configured, return minimal.
-    if not results:
-        return {"concerns": "Information not available (configure TAVILY_API_KEY for sourced concerns).", "sources": []}
 
+def _snippets_and_sources(results: list[dict]) -> tuple[list[str], list[dict]]:
     snippets = []
     sources = []
     for r in results[:5]:
@@ -46,7 +55,22 @@ def enrich_additive(code: str, *, name: str = "", risk: str = "unknown") -> dict
             snippets.append(f"- {title}: {content[:240]}")
         if url:
             sources.append({"title": title[:120], "url": url})
+    return snippets, sources
+
+
+def _parse_json_object(text: str) -> dict | None:
+    """First {...} block of an LLM reply (tolerates ```json fences / chatter)."""
+    start, end = (text or "").find("{"), (text or "").rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        obj = orjson.loads(text[start:end + 1])
+    except Exception:
+        return None
+    return obj if isinstance(obj, dict) else None
+
 
+def _summarize_one(code_u: str, name: str, snippets: list[str]) -> str:
     prompt = f"""
 Summarize the health concerns for the food additive {code_u} ({name}).
 
@@ -59,12 +83,117 @@ Output format:
 - 3–6 bullet concerns (short)
 - 1 bullet: who should be careful (e.g., children/asthma/allergies)
 """
-    concerns = answer(prompt)
+    return answer(prompt)
+
+
+def enrich_additive(code: str, *, name: str = "", risk: str = "unknown") -> dict:
+    code_u = (code or "").upper()
+    if not code_u:
+        return dict(_NO_INFO)
+
+    cached = _from_cache(get_cached_additive(code_u))
+    if cached:
+        return cached
+
+    results = _search(code_u, name)
+
+    # If Tavily isn't configured, return minimal.
+    if not results:
+        return {"concerns": _NO_TAVILY, "sources": []}
+
+    snippets, sources = _snippets_and_sources(results)
+    concerns = _summarize_one(code_u, name, snippets)
 
     # Cache
     try:
-        cache_additive(code_u, name, risk, concerns, json.dumps(sources))
+        cache_additive(code_u, name, risk, concerns, _dumps(sources))
     except Exception:
         pass
 
     return {"concerns": concerns, "sources": sources}
+
+
+def enrich_additives_bulk(items: list[tuple[str, str, str]]) -> dict[str, dict]:
+    """Enrich many (code, name, risk) additives at once; returns {CODE: {"concerns", "sources"}}.
+
+    Cache hits cost one query in total; misses are searched concurrently and
+    summarized by a single LLM call returning a JSON object keyed by code.
+    Codes missing from that reply are summarized one by one from the
+    snippets already fetched; with no LLM available they get no summary.
+    """
+    wanted: dict[str, tuple[str, str]] = {}
+    for code, name, risk in items:
+        code_u = (code or "").upper()
+        if code_u and code_u not in wanted:
+            wanted[code_u] = (name or "", risk or "unknown")
+
+    out: dict[str, dict] = {}
+    cached = get_cached_additives(wanted)
+    misses = []
+    for code_u in wanted:
+        hit = _from_cache(cached.get(code_u))
+        if hit:
+            out[code_u] = hit
+        else:
+            misses.append(code_u)
+    if not misses:
+        return out
+
+    if len(misses) == 1:
+        results_per_code = [_search(misses[0], wanted[misses[0]][0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(_SEARCH_WORKERS, len(misses))) as pool:
+            results_per_code = list(pool.map(lambda c: _search(c, wanted[c][0]), misses))
+
+    found: dict[str, tuple[list[str], list[dict]]] = {}
+    for code_u, results in zip(misses, results_per_code):
+        if results:
+            found[code_u] = _snippets_and_sources(results)
+        else:
+            out[code_u] = {"concerns": _NO_TAVILY, "sources": []}
+    if not found:
+        return out
+
+    blocks = []
+    for code_u, (snippets, _) in found.items():
+        blocks.append(f"[{code_u}] {wanted[code_u][0]}\n" + "\n".join(snippets))
+    prompt = f"""
+Summarize the health concerns for each food additive below.
+
+Use ONLY the sources listed under each additive. Be cautious. No medical diagnosis.
+
+{chr(10).join(blocks)}
+
+For each additive write:
+- 3–6 bullet concerns (short)
+- 1 bullet: who should be careful (e.g., children/asthma/allergies)
+
+Return ONLY a JSON object mapping each code to its bullets as one string, e.g. {{"{next(iter(found))}": "- ..."}}.
+"""
+    # ~6 short bullets per code; the reply is cut off as soon as the object closes.
+    reply = answer_json_object(prompt, max_tokens=min(250 * len(found), 4000))
+    if reply == FALLBACK_REPLY:
+        # No model answered; per-code prompts would fail the same way.
+        for code_u, (_, sources) in found.items():
+            out[code_u] = {"concerns": _NO_INFO["concerns"], "sources": sources}
+        return out
+    parsed = _parse_json_object(reply) or {}
+    parsed = {str(k).upper(): v for k, v in parsed.items()}
+
+    to_cache = []
+    for code_u, (snippets, sources) in found.items():
+        name, risk = wanted[code_u]
+        concerns = parsed.get(code_u)
+        if not isinstance(concerns, str) or not concerns.strip():
+            # Model skipped or mangled this code: summarize it on its own
+            # from the snippets already fetched.
+            concerns = _summarize_one(code_u, name, snippets)
+        out[code_u] = {"concerns": concerns, "sources": sources}
+        to_cache.append((code_u, name, risk, concerns, _dumps(sources)))
+
+    try:
+        cache_additives(to_cache)
+    except Exception:
+        pass
+
+    return out
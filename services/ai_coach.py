@@ -9,26 +9,93 @@ Set env var USE_HF_COACH=1 to enable.
 from __future__ import annotations
 
 import os
+import re
+import threading
+from string import Template
 
-from services.llm import answer
+from services.health_score import column_sums
+from services.llm import FALLBACK_REPLY, answer
 
 
+USE_HF_COACH = os.getenv("USE_HF_COACH", "0") == "1"
+
 _hf_generator = None
+_hf_loaded = False
+_hf_lock = threading.Lock()
+
+
+def _load_hf_generator():
+    from transformers import pipeline
+    # Prefer an int8 ONNX export (HF_COACH_ONNX_DIR, see README) over FP32 PyTorch.
+    onnx_dir = os.getenv("HF_COACH_ONNX_DIR")
+    if onnx_dir:
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+            from transformers import AutoTokenizer
+            return pipeline("text2text-generation", model=ORTModelForSeq2SeqLM.from_pretrained(onnx_dir),
+                            tokenizer=AutoTokenizer.from_pretrained(onnx_dir))
+        except Exception:
+            pass
+    # Small, quick, free
+    return pipeline("text2text-generation", model=os.getenv("HF_COACH_MODEL", "google/flan-t5-small"))
 
 
 def _get_hf_generator():
-    global _hf_generator
-    if _hf_generator is not None:
-        return _hf_generator
-    if os.getenv("USE_HF_COACH", "0") != "1":
-        return None
-    try:
-        from transformers import pipeline
-        # Small, quick, free
-        _hf_generator = pipeline("text2text-generation", model=os.getenv("HF_COACH_MODEL", "google/flan-t5-small"))
-        return _hf_generator
-    except Exception:
+    """Load the local coach model once; a failed load is remembered too."""
+    global _hf_generator, _hf_loaded
+    if not USE_HF_COACH:
         return None
+    if not _hf_loaded:
+        with _hf_lock:
+            if not _hf_loaded:
+                try:
+                    _hf_generator = _load_hf_generator()
+                except Exception:
+                    _hf_generator = None
+                _hf_loaded = True
+    return _hf_generator
+
+_COACH_PROMPT = Template("""
+You are NutriVision AI, a careful nutrition assistant.
+
+User profile:
+- Age: $age
+- Gender: $gender
+- Height_cm: $height
+- Weight_kg: $weight
+- Conditions: $conditions
+- Goal: $goals
+- Activity: $activity_level
+- Targets: $targets
+
+Recent logs (optional): $recent
+
+User question: $query
+
+Answer in:
+1) Recommendation (1 line)
+2) Why (2-4 bullets)
+3) If relevant: safe max quantity OR avoid
+4) Better swaps (1-3 bullets)
+
+Avoid diagnosis. Be specific with numbers (sugar/sodium) when applicable.
+""")
+
+# (query keywords, handler(user_profile, logs)), in priority order.
+_FAQ_TABLE = (
+    (("lose weight", "weight loss"), lambda profile, logs: get_weight_loss_advice(profile, logs)),
+    (("muscle", "gain"), lambda profile, logs: get_muscle_gain_advice(profile, logs)),
+    (("protein",), lambda profile, logs: get_protein_advice(profile, logs)),
+    (("sugar", "sweet"), lambda profile, logs: get_sugar_advice(logs)),
+    (("meal plan", "what should i eat"), lambda profile, logs: get_meal_suggestions(profile)),
+    (("additive", "processed"), lambda profile, logs: get_processing_advice(logs)),
+    (("diabetes",), lambda profile, logs: get_diabetes_advice()),
+    (("hypertension", "blood pressure"), lambda profile, logs: get_hypertension_advice()),
+)
+_FAQ_TOPIC = {kw: i for i, (keywords, _) in enumerate(_FAQ_TABLE) for kw in keywords}
+_FAQ_HANDLERS = [handler for _, handler in _FAQ_TABLE]
+_FAQ_RE = re.compile("|".join(map(re.escape, sorted(_FAQ_TOPIC, key=len, reverse=True))))
+
 
 def generate_coach_response(user_profile, logs, query=""):
     """
@@ -51,59 +118,27 @@ def generate_coach_response(user_profile, logs, query=""):
             "fat_g": user_profile.get("fat_target"),
         }
         recent = logs[-12:] if logs else []
-        prompt = f"""
-You are NutriVision AI, a careful nutrition assistant.
-
-User profile:
-- Age: {user_profile.get('age')}
-- Gender: {user_profile.get('gender')}
-- Height_cm: {user_profile.get('height')}
-- Weight_kg: {user_profile.get('weight')}
-- Conditions: {user_profile.get('conditions')}
-- Goal: {user_profile.get('goals')}
-- Activity: {user_profile.get('activity_level')}
-- Targets: {targets}
-
-Recent logs (optional): {recent}
-
-User question: {query}
-
-Answer in:
-1) Recommendation (1 line)
-2) Why (2-4 bullets)
-3) If relevant: safe max quantity OR avoid
-4) Better swaps (1-3 bullets)
-
-Avoid diagnosis. Be specific with numbers (sugar/sodium) when applicable.
-"""
-        return answer(prompt)
+        prompt = _COACH_PROMPT.substitute(
+            age=user_profile.get('age'),
+            gender=user_profile.get('gender'),
+            height=user_profile.get('height'),
+            weight=user_profile.get('weight'),
+            conditions=user_profile.get('conditions'),
+            goals=user_profile.get('goals'),
+            activity_level=user_profile.get('activity_level'),
+            targets=targets,
+            recent=recent,
+            query=query,
+        )
+        reply = answer(prompt)
+        if reply != FALLBACK_REPLY:
+            return reply
 
-    query_lower = (query or "").lower()
-    
-    # FAQ responses
-    if "lose weight" in query_lower or "weight loss" in query_lower:
-        return get_weight_loss_advice(user_profile, logs)
-    
-    if "muscle" in query_lower or "gain" in query_lower:
-        return get_muscle_gain_advice(user_profile, logs)
-    
-    if "protein" in query_lower:
-        return get_protein_advice(user_profile, logs)
-    
-    if "sugar" in query_lower or "sweet" in query_lower:
-        return get_sugar_advice(logs)
-    
-    if "meal plan" in query_lower or "what should i eat" in query_lower:
-        return get_meal_suggestions(user_profile)
-    
-    if "additive" in query_lower or "processed" in query_lower:
-        return get_processing_advice(logs)
-    
-    if "diabetes" in query_lower:
-        return get_diabetes_advice()
-    
-    if "hypertension" in query_lower or "blood pressure" in query_lower:
-        return get_hypertension_advice()
+    # No model available (or no question): rule-based FAQ responses.
+    # Earlier table entries win when a question matches several topics.
+    matches = [_FAQ_TOPIC[m.group(0)] for m in _FAQ_RE.finditer((query or "").lower())]
+    if matches:
+        return _FAQ_HANDLERS[min(matches)](user_profile, logs)
     
     # Default: Generate general weekly summary
     return generate_weekly_summary(user_profile, logs)
@@ -121,10 +156,11 @@ def generate_weekly_summary(user_profile, logs):
     messages = []
     
     # Calculate weekly averages
-    avg_calories = sum(log.get('calories', 0) for log in logs) / len(logs)
-    avg_sugar = sum(log.get('sugar', 0) for log in logs) / len(logs)
-    avg_protein = sum(log.get('protein', 0) for log in logs) / len(logs)
-    total_additives = sum(log.get('additives_count', 0) for log in logs)
+    sums = column_sums(logs, ('calories', 'sugar', 'protein', 'additives_count'))
+    avg_calories = sums['calories'] / len(logs)
+    avg_sugar = sums['sugar'] / len(logs)
+    avg_protein = sums['protein'] / len(logs)
+    total_additives = sums['additives_count']
     
     target_calories = user_profile.get('calorie_target', 2000)
     target_protein = user_profile.get('protein_target', 50)
@@ -167,49 +203,49 @@ def generate_weekly_summary(user_profile, logs):
     
     return " ".join(messages)
 
+_WEIGHT_LOSS_ADVICE = """🎯 For sustainable weight loss:
+
+1. Create a 500-calorie deficit (losing 0.5kg per week)
+2. Focus on high-protein foods (they keep you full longer)
+3. Eat more vegetables and fiber-rich foods
+4. Reduce ultra-processed foods and added sugars
+5. Stay hydrated with water instead of sugary drinks
+
+Remember: Slow and steady wins the race!"""
+
+_MUSCLE_GAIN_ADVICE = """💪 For effective muscle gain:
+
+1. Aim for {target_protein}g+ protein daily
+2. Eat in a slight calorie surplus (200-300 calories)
+3. Time protein intake around workouts
+4. Include complex carbs for energy
+5. Don't neglect healthy fats
+
+Best protein sources: chicken, fish, eggs, Greek yogurt, lentils, tofu"""
+
 def get_weight_loss_advice(user_profile, logs):
     """Specific advice for weight loss."""
-    advice = [
-        "🎯 For sustainable weight loss:",
-        "",
-        "1. Create a 500-calorie deficit (losing 0.5kg per week)",
-        "2. Focus on high-protein foods (they keep you full longer)",
-        "3. Eat more vegetables and fiber-rich foods",
-        "4. Reduce ultra-processed foods and added sugars",
-        "5. Stay hydrated with water instead of sugary drinks",
-        "",
-        "Remember: Slow and steady wins the race!"
-    ]
+    advice = _WEIGHT_LOSS_ADVICE
     
     if logs:
         avg_sugar = sum(log.get('sugar', 0) for log in logs) / len(logs)
         if avg_sugar > 30:
-            advice.append(f"\n⚠️ Your current sugar intake ({round(avg_sugar)}g/day) may hinder weight loss. Try cutting back on sweets and sodas.")
+            advice += f"\n\n⚠️ Your current sugar intake ({round(avg_sugar)}g/day) may hinder weight loss. Try cutting back on sweets and sodas."
     
-    return "\n".join(advice)
+    return advice
 
 def get_muscle_gain_advice(user_profile, logs):
     """Specific advice for muscle gain."""
     target_protein = user_profile.get('protein_target', 50)
     
-    advice = [
-        "💪 For effective muscle gain:",
-        "",
-        f"1. Aim for {target_protein}g+ protein daily",
-        "2. Eat in a slight calorie surplus (200-300 calories)",
-        "3. Time protein intake around workouts",
-        "4. Include complex carbs for energy",
-        "5. Don't neglect healthy fats",
-        "",
-        "Best protein sources: chicken, fish, eggs, Greek yogurt, lentils, tofu"
-    ]
+    advice = _MUSCLE_GAIN_ADVICE.format(target_protein=target_protein)
     
     if logs:
         avg_protein = sum(log.get('protein', 0) for log in logs) / len(logs)
         if avg_protein < target_protein * 0.8:
-            advice.append(f"\n⚠️ You're currently at {round(avg_protein)}g/day. Increase protein by adding a protein-rich snack.")
+            advice += f"\n\n⚠️ You're currently at {round(avg_protein)}g/day. Increase protein by adding a protein-rich snack."
     
-    return "\n".join(advice)
+    return advice
 
 def get_protein_advice(user_profile, logs):
     """Advice about protein intake."""
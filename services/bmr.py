@@ -1,5 +1,18 @@
 """BMR and TDEE calculation service."""
 
+from functools import lru_cache
+
+ACTIVITY_FACTORS = {
+    "sedentary": 1.2,
+    "light": 1.375,
+    "moderate": 1.55,
+    "active": 1.725,
+    "very_active": 1.9
+}
+
+# Mifflin-St Jeor constant term; anything other than "male" uses the female offset.
+_SEX_OFFSETS = {"male": 5, "female": -161}
+
 def calculate_bmr(weight, height, age, gender):
     """
     Calculate Basal Metabolic Rate using Mifflin-St Jeor Equation.
@@ -13,10 +26,7 @@ def calculate_bmr(weight, height, age, gender):
     Returns:
         BMR in calories/day
     """
-    if gender.lower() == "male":
-        return (10 * weight) + (6.25 * height) - (5 * age) + 5
-    else:
-        return (10 * weight) + (6.25 * height) - (5 * age) - 161
+    return (10 * weight) + (6.25 * height) - (5 * age) + _SEX_OFFSETS.get(gender.lower(), -161)
 
 def calculate_tdee(bmr, activity_level):
     """
@@ -29,14 +39,7 @@ def calculate_tdee(bmr, activity_level):
     Returns:
         TDEE in calories/day
     """
-    activity_factors = {
-        "sedentary": 1.2,
-        "light": 1.375,
-        "moderate": 1.55,
-        "active": 1.725,
-        "very_active": 1.9
-    }
-    return bmr * activity_factors.get(activity_level.lower(), 1.2)
+    return bmr * ACTIVITY_FACTORS.get(activity_level.lower(), 1.2)
 
 def generate_macro_targets(calories, goal):
     """
@@ -62,20 +65,30 @@ def generate_macro_targets(calories, goal):
     
     return round(calories), round(protein_g), round(carbs_g), round(fat_g)
 
+@lru_cache(maxsize=4096)
+def _user_targets(age, gender, height, weight, activity_level, goal):
+    bmr = calculate_bmr(weight, height, age, gender)
+    tdee = calculate_tdee(bmr, activity_level)
+    calories, protein, carbs, fat = generate_macro_targets(tdee, goal)
+    return round(bmr), round(tdee), calories, protein, carbs, fat
+
 def calculate_user_targets(age, gender, height, weight, activity_level, goal):
     """
     Calculate complete nutritional targets for a user.
     
+    Inputs are plain scalars, so results are memoized; each call still
+    returns a fresh dict.
+    
     Returns:
         Dictionary with calorie and macro targets
     """
-    bmr = calculate_bmr(weight, height, age, gender)
-    tdee = calculate_tdee(bmr, activity_level)
-    calories, protein, carbs, fat = generate_macro_targets(tdee, goal)
+    bmr, tdee, calories, protein, carbs, fat = _user_targets(
+        age, gender, height, weight, activity_level, goal
+    )
     
     return {
-        'bmr': round(bmr),
-        'tdee': round(tdee),
+        'bmr': bmr,
+        'tdee': tdee,
         'calorie_target': calories,
         'protein_target': protein,
         'carb_target': carbs,
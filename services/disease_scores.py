@@ -4,6 +4,8 @@
 Heuristic scores based on key nutrients; not medical advice.
 """
 
+from functools import lru_cache
+
 def _clamp(x): 
     return max(0, min(100, int(round(x))))
 
@@ -26,16 +28,37 @@ def cholesterol_score(product: dict) -> int:
         score -= 8
     return _clamp(score)
 
+_LABELS = ("Avoid", "Caution", "OK")
+
+def _label(score: int) -> str:
+    return _LABELS[(score >= 50) + (score >= 70)]
+
+# (condition keywords, panel title, scorer), in panel order.
+_CONDITION_SCORERS = (
+    (("diabetes",), "Diabetes", diabetes_score),
+    (("hypertension",), "Hypertension", hypertension_score),
+    (("high cholesterol", "cholesterol"), "Cholesterol", cholesterol_score),
+)
+
+@lru_cache(maxsize=256)
+def _scorers_for(conditions: str) -> tuple[tuple, ...]:
+    # A user's conditions string rarely changes, so the parse is memoized.
+    conds = frozenset(c.strip().lower() for c in (conditions or "").split(",") if c.strip())
+    return tuple((title, fn) for keys, title, fn in _CONDITION_SCORERS if not conds.isdisjoint(keys))
+
 def scores_for_conditions(product: dict, conditions: str) -> list[dict]:
-    conds = [c.strip().lower() for c in (conditions or "").split(",") if c.strip()]
+    return _panels(product, _scorers_for(conditions))
+
+def scores_for_products(products: list[dict], conditions: str) -> list[list[dict]]:
+    """scores_for_conditions for many products; the conditions string is parsed once."""
+    scorers = _scorers_for(conditions)
+    if not scorers:
+        return [[] for _ in products]
+    return [_panels(p, scorers) for p in products]
+
+def _panels(product: dict, scorers: tuple[tuple, ...]) -> list[dict]:
     panels = []
-    if "diabetes" in conds:
-        s = diabetes_score(product)
-        panels.append({"condition":"Diabetes", "score": s, "label": "Avoid" if s<50 else "Caution" if s<70 else "OK"})
-    if "hypertension" in conds:
-        s = hypertension_score(product)
-        panels.append({"condition":"Hypertension", "score": s, "label": "Avoid" if s<50 else "Caution" if s<70 else "OK"})
-    if "high cholesterol" in conds or "cholesterol" in conds:
-        s = cholesterol_score(product)
-        panels.append({"condition":"Cholesterol", "score": s, "label": "Avoid" if s<50 else "Caution" if s<70 else "OK"})
+    for title, fn in scorers:
+        s = fn(product)
+        panels.append({"condition": title, "score": s, "label": _label(s)})
     return panels
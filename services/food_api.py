@@ -1,7 +1,39 @@
 """Open Food Facts API integration."""
 
+import os
+
 import requests
-import json
+import orjson
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services.ttl_cache import TTLCache
+
+# Keep-alive pool for Open Food Facts; transient 429/5xx on GETs are retried.
+# Responses are gzip-compressed on the wire (urllib3 only decodes "br" when the
+# optional brotli package is installed, so it isn't advertised) and parsed from
+# response.content bytes without a str decode.
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": "NutriVision/1.0", "Accept": "application/json", "Accept-Encoding": "gzip"})
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=16,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=(429, 500, 502, 503, 504), raise_on_status=False),
+))
+
+# Only the keys normalize_product_data reads; OFF otherwise returns the full
+# product document (often hundreds of KB of translations and images).
+_PRODUCT_FIELDS = ",".join((
+    "code", "product_name", "brands", "image_url",
+    "nutriscore_grade", "nova_group", "ecoscore_grade", "nutriments",
+    "additives_tags", "allergens_tags", "ingredients_text",
+    "packaging_text", "packaging", "packaging_materials_tags",
+    "labels_tags", "categories", "serving_size", "serving_quantity",
+))
+
+# Search results change slowly and the same queries recur (search page, swaps).
+# Barcode lookups are cached by the caller (memory + SQLite), so only search is cached here.
+_search_mem = TTLCache(maxsize=1024, ttl=int(os.getenv("OFF_SEARCH_CACHE_TTL", "3600")))
 
 def fetch_product(barcode):
     """
@@ -16,9 +48,9 @@ def fetch_product(barcode):
     url = f"https://world.openfoodfacts.org/api/v2/product/{barcode}.json"
     
     try:
-        response = requests.get(url, timeout=5)
+        response = _SESSION.get(url, params={'fields': _PRODUCT_FIELDS}, timeout=5)
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         
         if data.get('status') == 1:
             return normalize_product_data(data.get('product', {}))
@@ -39,59 +71,61 @@ def normalize_product_data(raw_product):
     Returns:
         Normalized product dictionary
     """
-    nutriments = raw_product.get('nutriments', {})
+    get = raw_product.get
+    nutrient = get('nutriments', {}).get
+    labels = set(get('labels_tags') or ())
     
     # Extract additives
-    additives = raw_product.get('additives_tags', [])
-    additives_string = ','.join([a.replace('en:', '').upper() for a in additives])
+    additives = get('additives_tags', [])
+    additives_string = ','.join(additives).replace('en:', '').upper()
     
     # Extract allergens
-    allergens = raw_product.get('allergens_tags', [])
-    allergens_string = ','.join([a.replace('en:', '').replace('-', ' ').title() for a in allergens])
+    allergens = get('allergens_tags', [])
+    allergens_string = ','.join(allergens).replace('en:', '').replace('-', ' ').title()
     
     return {
-        'barcode': raw_product.get('code', ''),
-        'name': raw_product.get('product_name', 'Unknown Product'),
-        'brand': raw_product.get('brands', 'Unknown Brand'),
-        'image_url': raw_product.get('image_url', ''),
+        'barcode': get('code', ''),
+        'name': get('product_name', 'Unknown Product'),
+        'brand': get('brands', 'Unknown Brand'),
+        'image_url': get('image_url', ''),
         
         # Scores
-        'nutri_score': raw_product.get('nutriscore_grade', 'C').upper(),
-        'nova_group': raw_product.get('nova_group', 3),
-        'eco_score': raw_product.get('ecoscore_grade', 'C').upper(),
+        'nutri_score': get('nutriscore_grade', 'C').upper(),
+        'nova_group': get('nova_group', 3),
+        'eco_score': get('ecoscore_grade', 'C').upper(),
         
         # Nutrition per 100g
-        'calories': nutriments.get('energy-kcal_100g', 0),
-        'protein': nutriments.get('proteins_100g', 0),
-        'carbs': nutriments.get('carbohydrates_100g', 0),
-        'sugar': nutriments.get('sugars_100g', 0),
-        'fat': nutriments.get('fat_100g', 0),
-        'saturated_fat': nutriments.get('saturated-fat_100g', 0),
-        'fiber': nutriments.get('fiber_100g', 0),
-        'sodium': nutriments.get('sodium_100g', 0) * 1000,  # Convert to mg
-        'salt': nutriments.get('salt_100g', 0),
+        'calories': nutrient('energy-kcal_100g', 0),
+        'protein': nutrient('proteins_100g', 0),
+        'carbs': nutrient('carbohydrates_100g', 0),
+        'sugar': nutrient('sugars_100g', 0),
+        'fat': nutrient('fat_100g', 0),
+        'saturated_fat': nutrient('saturated-fat_100g', 0),
+        'fiber': nutrient('fiber_100g', 0),
+        'sodium': nutrient('sodium_100g', 0) * 1000,  # Convert to mg
+        'salt': nutrient('salt_100g', 0),
         
         # Additional info
         'additives': additives_string,
         'allergens': allergens_string,
-        'ingredients_text': raw_product.get('ingredients_text', ''),
+        'ingredients_text': get('ingredients_text', ''),
 
         # Packaging (used for microplastics heuristic)
-        'packaging': raw_product.get('packaging_text', raw_product.get('packaging', '')),
-        'packaging_materials': ','.join(raw_product.get('packaging_materials_tags', []) or []),
+        'packaging': get('packaging_text', get('packaging', '')),
+        'packaging_materials': ','.join(get('packaging_materials_tags', []) or []),
         
         # Dietary labels
-        'vegan': 1 if 'en:vegan' in raw_product.get('labels_tags', []) else 0,
-        'vegetarian': 1 if 'en:vegetarian' in raw_product.get('labels_tags', []) else 0,
-        'organic': 1 if 'en:organic' in raw_product.get('labels_tags', []) else 0,
-        'gluten_free': 1 if 'en:gluten-free' in raw_product.get('labels_tags', []) else 0,
+        'vegan': 1 if 'en:vegan' in labels else 0,
+        'vegetarian': 1 if 'en:vegetarian' in labels else 0,
+        'organic': 1 if 'en:organic' in labels else 0,
+        'gluten_free': 1 if 'en:gluten-free' in labels else 0,
         
         # Categories
-        'categories': raw_product.get('categories', ''),
+        'categories': get('categories', ''),
         
         # Serving size
-        'serving_size': raw_product.get('serving_size', ''),
-        'serving_quantity': raw_product.get('serving_quantity', 100),
+        'serving_size': get('serving_size', ''),
+        'serving_quantity': get('serving_quantity', 100),
     }
 
 def search_products(query, page=1, page_size=20):
@@ -106,19 +140,25 @@ def search_products(query, page=1, page_size=20):
     Returns:
         List of product dictionaries
     """
+    key = (query, page, page_size)
+    cached = _search_mem.get(key)
+    if cached is not None:
+        return [dict(p) for p in cached]
+    
     url = "https://world.openfoodfacts.org/cgi/search.pl"
     
     params = {
         'search_terms': query,
         'page': page,
         'page_size': page_size,
-        'json': 1
+        'json': 1,
+        'fields': _PRODUCT_FIELDS,
     }
     
     try:
-        response = requests.get(url, params=params, timeout=5)
+        response = _SESSION.get(url, params=params, timeout=5)
         response.raise_for_status()
-        data = response.json()
+        data = orjson.loads(response.content)
         
         products = []
         for raw_product in data.get('products', []):
@@ -128,6 +168,8 @@ def search_products(query, page=1, page_size=20):
                 print(f"Error normalizing product: {e}")
                 continue
         
+        if products:
+            _search_mem.set(key, [dict(p) for p in products])
         return products
     
     except Exception as e:
@@ -1,14 +1,31 @@
 """Health score calculation and analytics engine."""
 
 from datetime import datetime, timedelta
+from itertools import islice
 
-def calculate_health_score(logs, targets):
+
+def column_sums(logs, keys):
+    """Sum several nutrient columns in a single pass over the logs (None counts as 0)."""
+    totals = dict.fromkeys(keys, 0)
+    for log in logs:
+        for key in keys:
+            totals[key] += log.get(key) or 0
+    return totals
+
+
+# Every column calculate_health_score, get_weekly_stats and get_macro_distribution
+# read, so callers needing several of them can sum the logs once and pass `sums`.
+STATS_COLUMNS = ('calories', 'protein', 'carbs', 'fat', 'sugar', 'fiber', 'additives_count')
+
+
+def calculate_health_score(logs, targets, sums=None):
     """
     Calculate overall health score (0-100) based on food logs.
     
     Args:
         logs: List of food log dictionaries
         targets: User's nutritional targets
+        sums: Optional column_sums(logs, STATS_COLUMNS); skips re-summing logs
     
     Returns:
         Health score integer (0-100)
@@ -16,49 +33,56 @@ def calculate_health_score(logs, targets):
     if not logs:
         return 50  # Neutral score if no data
     
+    if sums is None:
+        sums = column_sums(logs, ('calories', 'sugar', 'additives_count', 'protein', 'fiber'))
+    return _score_kernel(
+        len(logs), sums['calories'], sums['sugar'], sums['additives_count'],
+        sums['protein'], sums['fiber'],
+        targets.get('calorie_target', 2000), targets.get('protein_target', 50),
+    )
+
+
+def _score_kernel(n, calories, sugar, additives, protein, fiber, target_calories, target_protein):
+    """Scalar scoring arithmetic over n logs' column sums (no dict access)."""
     score = 100
     
     # 1. Calorie adherence (weight: 30%)
-    avg_calories = sum(log.get('calories', 0) for log in logs) / len(logs)
-    target_calories = targets.get('calorie_target', 2000)
-    
+    avg_calories = calories / n
     calorie_diff = abs(avg_calories - target_calories) / target_calories
     calorie_penalty = min(calorie_diff * 30, 30)
     score -= calorie_penalty
     
     # 2. Sugar control (weight: 25%)
-    avg_sugar = sum(log.get('sugar', 0) for log in logs) / len(logs)
+    avg_sugar = sugar / n
     if avg_sugar > 30:  # More than 30g/day average is concerning
         sugar_penalty = min((avg_sugar - 30) / 2, 25)
         score -= sugar_penalty
     
     # 3. Ultra-processed food intake (weight: 25%)
-    total_additives = sum(log.get('additives_count', 0) for log in logs)
-    additive_penalty = min(total_additives, 25)
+    additive_penalty = min(additives, 25)
     score -= additive_penalty
     
     # 4. Protein adequacy (weight: 10%)
-    avg_protein = sum(log.get('protein', 0) for log in logs) / len(logs)
-    target_protein = targets.get('protein_target', 50)
-    
+    avg_protein = protein / n
     if avg_protein < target_protein * 0.8:  # Less than 80% of target
         protein_penalty = 10
         score -= protein_penalty
     
     # 5. Fiber intake (weight: 10%)
-    avg_fiber = sum(log.get('fiber', 0) for log in logs) / len(logs)
+    avg_fiber = fiber / n
     if avg_fiber < 25:  # Recommended daily fiber
         fiber_penalty = min((25 - avg_fiber) / 2.5, 10)
         score -= fiber_penalty
     
     return max(min(round(score), 100), 0)
 
-def get_weekly_stats(logs):
+def get_weekly_stats(logs, sums=None):
     """
     Calculate weekly statistics from food logs.
     
     Args:
         logs: List of food log dictionaries
+        sums: Optional column_sums(logs, STATS_COLUMNS); skips re-summing logs
     
     Returns:
         Dictionary with weekly stats
@@ -75,23 +99,26 @@ def get_weekly_stats(logs):
             'meals_logged': 0
         }
     
+    if sums is None:
+        sums = column_sums(logs, ('calories', 'protein', 'carbs', 'fat', 'sugar'))
     return {
-        'total_calories': sum(log.get('calories', 0) for log in logs),
-        'avg_calories': sum(log.get('calories', 0) for log in logs) / len(logs),
-        'total_protein': sum(log.get('protein', 0) for log in logs),
-        'total_carbs': sum(log.get('carbs', 0) for log in logs),
-        'total_fat': sum(log.get('fat', 0) for log in logs),
-        'total_sugar': sum(log.get('sugar', 0) for log in logs),
+        'total_calories': sums['calories'],
+        'avg_calories': sums['calories'] / len(logs),
+        'total_protein': sums['protein'],
+        'total_carbs': sums['carbs'],
+        'total_fat': sums['fat'],
+        'total_sugar': sums['sugar'],
         'days_logged': len(set(log.get('date') for log in logs if log.get('date'))),
         'meals_logged': len(logs)
     }
 
-def get_macro_distribution(logs):
+def get_macro_distribution(logs, sums=None):
     """
     Calculate macronutrient distribution percentages.
     
     Args:
         logs: List of food log dictionaries
+        sums: Optional column_sums(logs, STATS_COLUMNS); skips re-summing logs
     
     Returns:
         Dictionary with percentage distribution
@@ -99,14 +126,13 @@ def get_macro_distribution(logs):
     if not logs:
         return {'protein': 0, 'carbs': 0, 'fat': 0}
     
-    total_protein = sum(log.get('protein', 0) for log in logs)
-    total_carbs = sum(log.get('carbs', 0) for log in logs)
-    total_fat = sum(log.get('fat', 0) for log in logs)
+    if sums is None:
+        sums = column_sums(logs, ('protein', 'carbs', 'fat'))
     
     # Convert to calories (protein: 4 cal/g, carbs: 4 cal/g, fat: 9 cal/g)
-    protein_cal = total_protein * 4
-    carbs_cal = total_carbs * 4
-    fat_cal = total_fat * 9
+    protein_cal = sums['protein'] * 4
+    carbs_cal = sums['carbs'] * 4
+    fat_cal = sums['fat'] * 9
     
     total_cal = protein_cal + carbs_cal + fat_cal
     
@@ -138,13 +164,16 @@ def get_trends(logs):
     sorted_logs = sorted(logs, key=lambda x: x.get('date', ''))
     
     # Calculate recent vs older averages
+    # (summed through islice views, so neither half is copied)
     mid_point = len(sorted_logs) // 2
-    recent_logs = sorted_logs[mid_point:]
-    older_logs = sorted_logs[:mid_point]
+    n_recent = len(sorted_logs) - mid_point
+    n_older = mid_point
+    recent = column_sums(islice(sorted_logs, mid_point, None), ('calories', 'sugar'))
+    older = column_sums(islice(sorted_logs, mid_point), ('calories', 'sugar'))
     
     # Calorie trend
-    recent_cal = sum(log.get('calories', 0) for log in recent_logs) / len(recent_logs)
-    older_cal = sum(log.get('calories', 0) for log in older_logs) / len(older_logs)
+    recent_cal = recent['calories'] / n_recent
+    older_cal = older['calories'] / n_older
     
     cal_change = ((recent_cal - older_cal) / older_cal) * 100 if older_cal > 0 else 0
     
@@ -158,8 +187,8 @@ def get_trends(logs):
         })
     
     # Sugar trend
-    recent_sugar = sum(log.get('sugar', 0) for log in recent_logs) / len(recent_logs)
-    older_sugar = sum(log.get('sugar', 0) for log in older_logs) / len(older_logs)
+    recent_sugar = recent['sugar'] / n_recent
+    older_sugar = older['sugar'] / n_older
     
     sugar_change = ((recent_sugar - older_sugar) / older_sugar) * 100 if older_sugar > 0 else 0
     
@@ -174,13 +203,14 @@ def get_trends(logs):
     
     return {'trends': trends}
 
-def generate_daily_insight(logs, targets):
+def generate_daily_insight(logs, targets, totals=None):
     """
     Generate AI-powered daily insight based on food logs.
     
     Args:
         logs: Today's food log dictionaries
         targets: User's nutritional targets
+        totals: Optional pre-aggregated day sums (e.g. from SQL); skips re-summing logs
     
     Returns:
         Insight message string
@@ -191,10 +221,12 @@ def generate_daily_insight(logs, targets):
     insights = []
     
     # Calculate today's totals
-    total_calories = sum(log.get('calories', 0) for log in logs)
-    total_sugar = sum(log.get('sugar', 0) for log in logs)
-    total_protein = sum(log.get('protein', 0) for log in logs)
-    total_additives = sum(log.get('additives_count', 0) for log in logs)
+    if totals is None:
+        totals = column_sums(logs, ('calories', 'sugar', 'protein', 'additives_count'))
+    total_calories = totals['calories']
+    total_sugar = totals['sugar']
+    total_protein = totals['protein']
+    total_additives = totals['additives_count']
     
     # Calorie insight
     target_calories = targets.get('calorie_target', 2000)
@@ -8,9 +8,28 @@ No paid OpenAI/GPT required.
 
 from __future__ import annotations
 
+import hashlib
 import os
-import json
+import threading
+from typing import Iterator
+
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+
+from database import get_llm_reply, save_llm_reply
+from services.ttl_cache import TTLCache
+
+# Replies are cached by prompt digest: hot prompts in process memory, the rest
+# in SQLite so they survive restarts and are shared between workers.
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+_reply_mem = TTLCache(maxsize=512, ttl=LLM_CACHE_TTL)
+
+# One keep-alive pool for Groq/OpenRouter so retries and back-to-back prompts
+# skip the TCP+TLS handshake. Auth stays per request (two providers, two keys).
+_SESSION = requests.Session()
+_SESSION.headers["Content-Type"] = "application/json"
+_SESSION.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=16))
 
 
 
@@ -27,15 +46,14 @@ def openrouter_chat(messages: list[dict], *, model: str | None = None, max_token
     }
     headers = {
         "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json",
         # optional but recommended by OpenRouter
         "HTTP-Referer": os.getenv("OPENROUTER_SITE", "http://localhost"),
         "X-Title": os.getenv("OPENROUTER_APP", "NutriVision"),
     }
     try:
-        r = requests.post(url, headers=headers, data=json.dumps(payload), timeout=25)
+        r = _SESSION.post(url, headers=headers, data=orjson.dumps(payload), timeout=25)
         r.raise_for_status()
-        data = r.json() or {}
+        data = orjson.loads(r.content) or {}
         return (((data.get("choices") or [{}])[0]).get("message") or {}).get("content")
     except Exception:
         return None
@@ -53,31 +71,205 @@ def groq_chat(messages: list[dict], *, model: str = "llama-3.1-8b-instant", max_
         "max_tokens": max_tokens,
     }
     try:
-        r = requests.post(url, headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"}, data=json.dumps(payload), timeout=20)
+        r = _SESSION.post(url, headers={"Authorization": f"Bearer {key}"}, data=orjson.dumps(payload), timeout=20)
         r.raise_for_status()
-        data = r.json() or {}
+        data = orjson.loads(r.content) or {}
         return (((data.get("choices") or [{}])[0]).get("message") or {}).get("content")
     except Exception:
         return None
 
 
+def groq_chat_stream(messages: list[dict], *, model: str = "llama-3.1-8b-instant", max_tokens: int = 350) -> Iterator[str]:
+    """Yield Groq completion text deltas as they arrive (nothing if unconfigured/failing).
+
+    Closing the generator early closes the HTTP response, which stops the
+    server generating further tokens.
+    """
+    key = os.getenv("GROQ_API_KEY")
+    if not key:
+        return
+    url = "https://api.groq.com/openai/v1/chat/completions"
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": 0.2,
+        "max_tokens": max_tokens,
+        "stream": True,
+    }
+    try:
+        with _SESSION.post(url, headers={"Authorization": f"Bearer {key}"}, data=orjson.dumps(payload), timeout=20, stream=True) as r:
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if not line.startswith(b"data: "):
+                    continue
+                data = line[len(b"data: "):]
+                if data == b"[DONE]":
+                    break
+                delta = (((orjson.loads(data).get("choices") or [{}])[0]).get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+    except Exception:
+        return
+
+
+def _json_object_end(text: str, start: int, state: list) -> int:
+    """Scan text[start:] for the end of the first top-level JSON object.
+
+    state is [depth, in_string, escaped, seen_open] carried across calls so the
+    text can be fed incrementally. Returns the index just past the closing
+    brace, or -1 if the object isn't complete yet.
+    """
+    depth, in_string, escaped, seen_open = state
+    for i in range(start, len(text)):
+        ch = text[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = seen_open
+        elif ch == "{":
+            depth += 1
+            seen_open = True
+        elif ch == "}" and seen_open:
+            depth -= 1
+            if depth == 0:
+                state[:] = [depth, in_string, escaped, seen_open]
+                return i + 1
+    state[:] = [depth, in_string, escaped, seen_open]
+    return -1
+
+
 _local_pipe = None
+_local_loaded = False
+_local_lock = threading.Lock()
+
+
+def _load_local_pipe():
+    from transformers import pipeline
+    # Prefer an int8 ONNX export (HF_LLM_ONNX_DIR, see README) over FP32 PyTorch.
+    onnx_dir = os.getenv("HF_LLM_ONNX_DIR")
+    if onnx_dir:
+        try:
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+            from transformers import AutoTokenizer
+            return pipeline("text2text-generation", model=ORTModelForSeq2SeqLM.from_pretrained(onnx_dir),
+                            tokenizer=AutoTokenizer.from_pretrained(onnx_dir))
+        except Exception:
+            pass
+    return pipeline("text2text-generation", model=os.getenv("HF_LLM_MODEL", "google/flan-t5-small"))
+
+
+def get_local_pipe():
+    """Load the local fallback model once; a failed load is remembered too."""
+    global _local_pipe, _local_loaded
+    if not _local_loaded:
+        with _local_lock:
+            if not _local_loaded:
+                try:
+                    _local_pipe = _load_local_pipe()
+                except Exception:
+                    _local_pipe = None
+                _local_loaded = True
+    return _local_pipe
 
 
 def local_text2text(prompt: str) -> str | None:
-    global _local_pipe
+    pipe = get_local_pipe()
+    if pipe is None:
+        return None
     try:
-        if _local_pipe is None:
-            from transformers import pipeline
-
-            _local_pipe = pipeline("text2text-generation", model="google/flan-t5-base")
-        out = _local_pipe(prompt, max_length=220)
+        out = pipe(prompt, max_length=220)
         return (out[0] or {}).get("generated_text")
     except Exception:
         return None
 
 
-def answer(prompt: str, *, system: str = "You are a careful, health-focused nutrition assistant.") -> str:
+# Returned by answer() when no model is reachable; callers can compare against it.
+FALLBACK_REPLY = "Tell me your age, weight, height, goal, and any conditions (e.g., diabetes, hypertension). Then ask your question again and I’ll answer using rules even without an AI key."
+
+
+_SYSTEM = "You are a careful, health-focused nutrition assistant."
+
+
+def _cache_key(prompt: str, system: str) -> bytes:
+    return hashlib.blake2b(f"{system}\0{prompt}".encode(), digest_size=16).digest()
+
+
+def _cached_reply(key: bytes) -> str | None:
+    reply = _reply_mem.get(key)
+    if reply is None:
+        try:
+            reply = get_llm_reply(key, LLM_CACHE_TTL)
+        except Exception:
+            reply = None
+        if reply is not None:
+            _reply_mem.set(key, reply)
+    return reply
+
+
+def _store_reply(key: bytes, reply: str) -> None:
+    # The no-model fallback isn't cached so a configured key takes effect at once.
+    if reply == FALLBACK_REPLY:
+        return
+    try:
+        save_llm_reply(key, reply)
+    except Exception:
+        pass
+    _reply_mem.set(key, reply)
+
+
+def answer(prompt: str, *, system: str = _SYSTEM) -> str:
+    key = _cache_key(prompt, system)
+    reply = _cached_reply(key)
+    if reply is None:
+        reply = _answer_uncached(prompt, system)
+        _store_reply(key, reply)
+    return reply
+
+
+def answer_json_object(prompt: str, *, system: str = _SYSTEM, max_tokens: int = 350) -> str:
+    """Like answer(), for prompts whose reply is a single JSON object.
+
+    With Groq the reply is streamed and the request is dropped as soon as the
+    object's closing brace arrives, so trailing chatter isn't waited for.
+    Falls back to answer() when the stream ends without a complete object.
+    """
+    key = _cache_key(prompt, system)
+    reply = _cached_reply(key)
+    if reply is not None:
+        return reply
+    msg = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt},
+    ]
+    text = ""
+    state = [0, False, False, False]
+    end = -1
+    stream = groq_chat_stream(msg, max_tokens=max_tokens)
+    try:
+        for delta in stream:
+            start = len(text)
+            text += delta
+            end = _json_object_end(text, start, state)
+            if end >= 0:
+                text = text[:end]
+                break
+    finally:
+        stream.close()
+    if end < 0:
+        # Nothing streamed, or it stopped before the object closed (token
+        # limit, dropped connection); never cache a truncated object.
+        return answer(prompt, system=system)
+    reply = text.strip()
+    _store_reply(key, reply)
+    return reply
+
+
+def _answer_uncached(prompt: str, system: str) -> str:
     msg = [
         {"role": "system", "content": system},
         {"role": "user", "content": prompt},
@@ -92,4 +284,4 @@ def answer(prompt: str, *, system: str = "You are a careful, health-focused nutr
     if l:
         return l.strip()
     # final fallback: still provide helpful, non-AI guidance
-    return "Tell me your age, weight, height, goal, and any conditions (e.g., diabetes, hypertension). Then ask your question again and I’ll answer using rules even without an AI key."
+    return FALLBACK_REPLY
@@ -1,5 +1,92 @@
 """Medical condition rules engine for personalized warnings."""
 
+def _diabetes_rule(product, warnings):
+    penalty = 0
+    sugar = product.get('sugar', 0)
+    if sugar > 15:
+        penalty += 25
+        warnings.append({
+            'severity': 'high',
+            'condition': 'Diabetes',
+            'message': f'Very high sugar content ({sugar}g/100g) - Not recommended for diabetics'
+        })
+    elif sugar > 10:
+        penalty += 15
+        warnings.append({
+            'severity': 'medium',
+            'condition': 'Diabetes',
+            'message': f'High sugar content ({sugar}g/100g) - Use caution if diabetic'
+        })
+    
+    # Check for high glycemic carbs
+    if product.get('nova_group', 1) >= 3:
+        penalty += 10
+        warnings.append({
+            'severity': 'medium',
+            'condition': 'Diabetes',
+            'message': 'Processed foods may cause rapid blood sugar spikes'
+        })
+    return penalty
+
+def _hypertension_rule(product, warnings):
+    sodium = product.get('sodium', 0)
+    if sodium > 500:
+        warnings.append({
+            'severity': 'high',
+            'condition': 'Hypertension',
+            'message': f'Very high sodium ({sodium}mg/100g) - May increase blood pressure'
+        })
+        return 25
+    if sodium > 300:
+        warnings.append({
+            'severity': 'medium',
+            'condition': 'Hypertension',
+            'message': f'High sodium content ({sodium}mg/100g) - Monitor intake'
+        })
+        return 15
+    return 0
+
+def _cholesterol_rule(product, warnings):
+    penalty = 0
+    fat = product.get('fat', 0)
+    saturated_fat = product.get('saturated_fat', fat * 0.3)  # Estimate if not available
+    
+    if saturated_fat > 5:
+        penalty += 20
+        warnings.append({
+            'severity': 'high',
+            'condition': 'High Cholesterol',
+            'message': f'High saturated fat content - May raise LDL cholesterol'
+        })
+    
+    if fat > 20:
+        penalty += 10
+        warnings.append({
+            'severity': 'medium',
+            'condition': 'High Cholesterol',
+            'message': 'High total fat content - Monitor portion sizes'
+        })
+    return penalty
+
+def _pcos_rule(product, warnings):
+    if product.get('sugar', 0) > 10:
+        warnings.append({
+            'severity': 'medium',
+            'condition': 'PCOS',
+            'message': 'High sugar may worsen insulin resistance associated with PCOS'
+        })
+        return 15
+    return 0
+
+# (condition keywords, rule), in warning order. Each rule appends its warnings
+# and returns the penalty it adds.
+_CONDITION_RULES = (
+    (frozenset({'diabetes'}), _diabetes_rule),
+    (frozenset({'hypertension'}), _hypertension_rule),
+    (frozenset({'cholesterol', 'high cholesterol'}), _cholesterol_rule),
+    (frozenset({'pcos'}), _pcos_rule),
+)
+
 def apply_medical_penalties(product, user_conditions):
     """
     Apply penalties and generate warnings based on user medical conditions.
@@ -15,86 +102,14 @@ def apply_medical_penalties(product, user_conditions):
         conditions = [c.strip().lower() for c in user_conditions.split(',') if c.strip()]
     else:
         conditions = [c.lower() for c in user_conditions]
+    cond_set = frozenset(conditions)
     
     penalty = 0
     warnings = []
     
-    # Diabetes rules
-    if 'diabetes' in conditions:
-        sugar = product.get('sugar', 0)
-        if sugar > 15:
-            penalty += 25
-            warnings.append({
-                'severity': 'high',
-                'condition': 'Diabetes',
-                'message': f'Very high sugar content ({sugar}g/100g) - Not recommended for diabetics'
-            })
-        elif sugar > 10:
-            penalty += 15
-            warnings.append({
-                'severity': 'medium',
-                'condition': 'Diabetes',
-                'message': f'High sugar content ({sugar}g/100g) - Use caution if diabetic'
-            })
-        
-        # Check for high glycemic carbs
-        if product.get('nova_group', 1) >= 3:
-            penalty += 10
-            warnings.append({
-                'severity': 'medium',
-                'condition': 'Diabetes',
-                'message': 'Processed foods may cause rapid blood sugar spikes'
-            })
-    
-    # Hypertension rules
-    if 'hypertension' in conditions:
-        sodium = product.get('sodium', 0)
-        if sodium > 500:
-            penalty += 25
-            warnings.append({
-                'severity': 'high',
-                'condition': 'Hypertension',
-                'message': f'Very high sodium ({sodium}mg/100g) - May increase blood pressure'
-            })
-        elif sodium > 300:
-            penalty += 15
-            warnings.append({
-                'severity': 'medium',
-                'condition': 'Hypertension',
-                'message': f'High sodium content ({sodium}mg/100g) - Monitor intake'
-            })
-    
-    # High cholesterol rules
-    if 'cholesterol' in conditions or 'high cholesterol' in conditions:
-        fat = product.get('fat', 0)
-        saturated_fat = product.get('saturated_fat', fat * 0.3)  # Estimate if not available
-        
-        if saturated_fat > 5:
-            penalty += 20
-            warnings.append({
-                'severity': 'high',
-                'condition': 'High Cholesterol',
-                'message': f'High saturated fat content - May raise LDL cholesterol'
-            })
-        
-        if fat > 20:
-            penalty += 10
-            warnings.append({
-                'severity': 'medium',
-                'condition': 'High Cholesterol',
-                'message': 'High total fat content - Monitor portion sizes'
-            })
-    
-    # PCOS rules
-    if 'pcos' in conditions:
-        sugar = product.get('sugar', 0)
-        if sugar > 10:
-            penalty += 15
-            warnings.append({
-                'severity': 'medium',
-                'condition': 'PCOS',
-                'message': 'High sugar may worsen insulin resistance associated with PCOS'
-            })
+    for keys, rule in _CONDITION_RULES:
+        if not cond_set.isdisjoint(keys):
+            penalty += rule(product, warnings)
     
     # Allergen checks
     allergens = product.get('allergens', '')
@@ -6,6 +6,7 @@ If OCR fails, returns empty list.
 
 from __future__ import annotations
 
+import re
 from io import BytesIO
 from typing import Any
 
@@ -17,36 +18,50 @@ except Exception:  # pragma: no cover
     pytesseract = None
 
 
+def _any_of(*keywords: str) -> re.Pattern[str]:
+    """One compiled alternation per keyword group (substring semantics, like `k in text`)."""
+    return re.compile("|".join(map(re.escape, keywords)))
+
+
+_OCR_MAX_SIDE = 1600
+
+# A plausible dish line has at least three letters ([^\W\d_] is a Unicode letter).
+# The search stops at the third letter, so it beats counting letters via str.translate.
+_THREE_LETTERS = re.compile(r"[^\W\d_](?:.*?[^\W\d_]){2}")
+
+_GOOD_RE = _any_of("salad", "grilled", "steam", "steamed", "baked", "soup", "vegetable", "lentil", "dal", "fish", "chicken", "yogurt", "roasted")
+_HIGH_SUGAR_RE = _any_of("sweet", "sugar", "dessert", "cake", "cola", "juice", "ice cream", "milkshake", "donut")
+_HIGH_SODIUM_RE = _any_of("salt", "fried", "pickle", "chips", "processed", "sausage", "bacon", "ramen", "noodles", "soy sauce")
+_FRIED_FAST_RE = _any_of("fried", "burger", "fries", "pizza")
+_RICH_RE = _any_of("fried", "cream", "cheese", "pizza")
+_PROTEIN_RE = _any_of("chicken", "fish", "egg", "paneer", "lentil", "dal")
+
+
 def ocr_menu_items(image_bytes: bytes) -> list[str]:
     if not image_bytes:
         return []
+    if pytesseract is None:
+        return []
     try:
-        img = Image.open(BytesIO(image_bytes)).convert("RGB")
+        img = Image.open(BytesIO(image_bytes))
+        # Tesseract only needs luminance, and ~1600px keeps menu text legible;
+        # draft() lets JPEG decode straight to a reduced grayscale image.
+        img.draft("L", (_OCR_MAX_SIDE, _OCR_MAX_SIDE))
+        img = img.convert("L")
+        img.thumbnail((_OCR_MAX_SIDE, _OCR_MAX_SIDE))
     except Exception:
         return []
 
-    if pytesseract is None:
-        return []
-
     text = pytesseract.image_to_string(img)
-    lines = [l.strip() for l in text.splitlines()]
-    # Keep plausible dish lines
-    items: list[str] = []
-    for l in lines:
-        if len(l) < 3:
-            continue
-        if any(ch.isalpha() for ch in l) and sum(ch.isalpha() for ch in l) >= 3:
-            items.append(l)
-    # De-dup (preserve order)
-    seen = set()
-    out = []
-    for it in items:
-        key = it.lower()
-        if key in seen:
-            continue
-        seen.add(key)
-        out.append(it)
-    return out[:30]
+    # Keep plausible dish lines, de-duplicated case-insensitively (first spelling wins)
+    items: dict[str, str] = {}
+    for l in text.splitlines():
+        l = l.strip()
+        if _THREE_LETTERS.search(l):
+            items.setdefault(l.lower(), l)
+            if len(items) == 30:
+                break
+    return list(items.values())
 
 
 def recommend_menu_items(items: list[str], profile: dict[str, Any]) -> list[dict[str, Any]]:
@@ -55,35 +70,35 @@ def recommend_menu_items(items: list[str], profile: dict[str, Any]) -> list[dict
     goal = (profile.get("goals") or "").lower()
     cond = (profile.get("conditions") or "").lower()
 
-    good_kw = ["salad", "grilled", "steam", "steamed", "baked", "soup", "vegetable", "lentil", "dal", "fish", "chicken", "yogurt", "roasted"]
-    high_sugar_kw = ["sweet", "sugar", "dessert", "cake", "cola", "juice", "ice cream", "milkshake", "donut"]
-    high_sodium_kw = ["salt", "fried", "pickle", "chips", "processed", "sausage", "bacon", "ramen", "noodles", "soy sauce"]
-    fried_fast_kw = ["fried", "burger", "fries", "pizza"]
+    diabetes = "diabetes" in cond
+    hypertension = "hypertension" in cond
+    losing = "lose" in goal
+    gaining = "gain" in goal or "muscle" in goal
 
     def evaluate(it: str) -> dict[str, Any]:
         t = it.lower()
         score = 70
         reasons: list[str] = []
 
-        if any(k in t for k in good_kw):
+        if _GOOD_RE.search(t):
             score += 12
             reasons.append("Likely lighter prep (grilled/steamed/baked).")
-        if any(k in t for k in fried_fast_kw):
+        if _FRIED_FAST_RE.search(t):
             score -= 22
             reasons.append("Often calorie-dense / higher saturated fat (fried/fast food).")
 
-        if "diabetes" in cond and any(k in t for k in high_sugar_kw):
+        if diabetes and _HIGH_SUGAR_RE.search(t):
             score -= 35
             reasons.append("High sugar risk — not diabetes-friendly.")
-        if "hypertension" in cond and any(k in t for k in high_sodium_kw):
+        if hypertension and _HIGH_SODIUM_RE.search(t):
             score -= 28
             reasons.append("Likely high sodium — caution for hypertension.")
 
-        if ("lose" in goal) and any(k in t for k in ["fried", "cream", "cheese", "pizza"]):
+        if losing and _RICH_RE.search(t):
             score -= 10
             reasons.append("May slow fat-loss due to calories/fats.")
 
-        if ("gain" in goal or "muscle" in goal) and any(k in t for k in ["chicken", "fish", "egg", "paneer", "lentil", "dal"]):
+        if gaining and _PROTEIN_RE.search(t):
             score += 8
             reasons.append("Likely higher protein." )
 
@@ -7,21 +7,42 @@ This keeps demo responsive even without torch/transformers.
 """
 
 from __future__ import annotations
-import os, json, requests
+import hashlib, os, requests
+import orjson
+from requests.adapters import HTTPAdapter
+from services.ttl_cache import TTLCache
 from services.usda_api import search_food
 
 HF_MODEL = os.getenv("HF_FOOD_MODEL", "nateraw/food")
 HF_TOKEN = os.getenv("HF_TOKEN")  # optional
 
+# Keep-alive pool for the HF Inference API.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
+
+# Re-uploads of the same photo and repeat labels skip the network entirely.
+# Only successful lookups are cached so a transient failure isn't remembered.
+_label_mem = TTLCache(maxsize=256, ttl=3600)  # image digest -> (label, confidence)
+_usda_mem = TTLCache(maxsize=512, ttl=3600)   # lower-cased label -> FDC matches
+
 def _hf_classify(image_bytes: bytes):
     if not HF_TOKEN:
         return None
+    key = hashlib.blake2b(image_bytes, digest_size=16).digest()
+    pred = _label_mem.get(key)
+    if pred is None:
+        pred = _hf_classify_uncached(image_bytes)
+        if pred:
+            _label_mem.set(key, pred)
+    return pred
+
+def _hf_classify_uncached(image_bytes: bytes):
     url = f"https://api-inference.huggingface.co/models/{HF_MODEL}"
     headers = {"Authorization": f"Bearer {HF_TOKEN}"}
     try:
-        r = requests.post(url, headers=headers, data=image_bytes, timeout=25)
+        r = _SESSION.post(url, headers=headers, data=image_bytes, timeout=25)
         r.raise_for_status()
-        data = r.json()
+        data = orjson.loads(r.content)
         if isinstance(data, list) and data:
             top = data[0]
             label = top.get("label")
@@ -39,9 +60,13 @@ def analyze_photo(image_bytes: bytes):
 
     label, conf = pred
     # USDA keyword search (best-effort)
-    usda = None
-    try:
-        usda = search_food(label)
-    except Exception:
-        usda = None
+    key = (label or "").strip().lower()
+    usda = _usda_mem.get(key)
+    if usda is None:
+        try:
+            usda = search_food(label)
+        except Exception:
+            usda = None
+        if usda:
+            _usda_mem.set(key, usda)
     return {"label": label, "confidence": conf, "usda": usda}
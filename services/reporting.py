@@ -8,7 +8,7 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta
 from io import BytesIO
-from typing import Any
+from typing import Any, BinaryIO, Iterable
 
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.units import inch
@@ -17,41 +17,63 @@ from reportlab.pdfgen import canvas
 from services.risk_index import compute_daily_risk
 
 
-def _date(s: str) -> datetime:
-    return datetime.strptime(s, "%Y-%m-%d")
-
-
-def build_weekly_pdf(profile: dict[str, Any], logs: list[dict[str, Any]]) -> bytes:
-    """Create a 7-day PDF summary from stored logs."""
+def _day_totals(day_items: list[dict[str, Any]]) -> dict[str, float]:
+    """Table columns plus the compute_daily_risk inputs, in one pass over the day."""
+    cal = p = c = f = sugar = sodium = 0.0
+    additives = nova4 = 0
+    for x in day_items:
+        cal += float(x.get("calories", 0) or 0)
+        p += float(x.get("protein", 0) or 0)
+        c += float(x.get("carbs", 0) or 0)
+        f += float(x.get("fat", 0) or 0)
+        sugar += float(x.get("sugar", 0) or 0)
+        sodium += float(x.get("sodium", 0) or 0)
+        additives += int(x.get("additives_count", 0) or 0)
+        nova4 += int(x.get("nova_group") or 0) == 4
+    return {
+        "cal": cal, "p": p, "c": c, "f": f, "sugar": sugar, "sodium": sodium,
+        "additives_count": additives, "nova4_count": nova4,
+    }
+
+
+def build_weekly_pdf(
+    profile: dict[str, Any],
+    logs: Iterable[dict[str, Any]],
+    *,
+    sink: BinaryIO | None = None,
+) -> bytes | None:
+    """Create a 7-day PDF summary from stored logs.
+
+    With ``sink`` the PDF is written to that binary file object and None is
+    returned, avoiding an extra in-memory copy of the document.
+    """
 
     # Filter last 7 days (including today)
     today = datetime.now().date()
     start = today - timedelta(days=6)
-    week_logs = [l for l in logs if l.get("date") and start <= _date(l["date"]).date() <= today]
+    # Log dates are zero-padded ISO strings, so they compare correctly as text.
+    start_s, today_s = start.isoformat(), today.isoformat()
+    week_logs = [l for l in logs if (d := l.get("date")) and start_s <= d <= today_s]
 
     # Group by day
     by_day: dict[str, list[dict[str, Any]]] = {}
     for l in week_logs:
         by_day.setdefault(l["date"], []).append(l)
 
-    def totals(day_items: list[dict[str, Any]]) -> dict[str, float]:
-        return {
-            "cal": sum(float(x.get("calories", 0) or 0) for x in day_items),
-            "p": sum(float(x.get("protein", 0) or 0) for x in day_items),
-            "c": sum(float(x.get("carbs", 0) or 0) for x in day_items),
-            "f": sum(float(x.get("fat", 0) or 0) for x in day_items),
-            "sugar": sum(float(x.get("sugar", 0) or 0) for x in day_items),
-            "sodium": sum(float(x.get("sodium", 0) or 0) for x in day_items),
-        }
+    # Per-day totals and risk, computed once and shared by the summary and the table
+    days_sorted = sorted(by_day.keys())
+    day_stats: dict[str, tuple[dict[str, float], dict[str, Any]]] = {}
+    for d in days_sorted:
+        t = _day_totals(by_day[d])
+        day_stats[d] = (t, compute_daily_risk(by_day[d], profile, t))
 
     # Weekly metrics
-    days_sorted = sorted(by_day.keys())
-    risk_vals = [compute_daily_risk(by_day[d], profile)["score"] for d in days_sorted]
+    risk_vals = [r["score"] for _, r in day_stats.values()]
     avg_risk = round(sum(risk_vals) / max(1, len(risk_vals)), 1)
-    avg_cal = round(sum(totals(by_day[d])["cal"] for d in days_sorted) / max(1, len(days_sorted)), 0)
+    avg_cal = round(sum(t["cal"] for t, _ in day_stats.values()) / max(1, len(days_sorted)), 0)
 
     # Build PDF
-    buf = BytesIO()
+    buf = BytesIO() if sink is None else sink
     c = canvas.Canvas(buf, pagesize=letter)
     w, h = letter
 
@@ -92,20 +114,32 @@ def build_weekly_pdf(profile: dict[str, Any], logs: list[dict[str, Any]]) -> byt
     c.line(0.8 * inch, y, 7.6 * inch, y)
     y -= 0.15 * inch
 
+    # Rows go into one text object per page (a single BT/ET block) rather
+    # than a separate text block per cell.
+    tx = c.beginText()
+    tx.setFont("Helvetica", 9)
     for d in days_sorted:
-        t = totals(by_day[d])
-        r = compute_daily_risk(by_day[d], profile)
-        c.drawString(0.8 * inch, y, d)
-        c.drawString(2.0 * inch, y, str(int(round(t["cal"], 0))))
-        c.drawString(3.0 * inch, y, f"{int(round(t['p']))}/{int(round(t['c']))}/{int(round(t['f']))}")
-        c.drawString(4.2 * inch, y, f"{int(round(t['sugar']))}g")
-        c.drawString(4.9 * inch, y, f"{int(round(t['sodium']))}mg")
-        c.drawString(5.7 * inch, y, f"{r['score']} ({r['level']})")
+        t, r = day_stats[d]
+        cells = (
+            (0.8, d),
+            (2.0, str(int(round(t["cal"], 0)))),
+            (3.0, f"{int(round(t['p']))}/{int(round(t['c']))}/{int(round(t['f']))}"),
+            (4.2, f"{int(round(t['sugar']))}g"),
+            (4.9, f"{int(round(t['sodium']))}mg"),
+            (5.7, f"{r['score']} ({r['level']})"),
+        )
+        for x, text in cells:
+            tx.setTextOrigin(x * inch, y)
+            tx.textOut(text)
         y -= 0.18 * inch
         if y < 1.2 * inch:
+            c.drawText(tx)
             c.showPage()
             y = h - 0.8 * inch
             c.setFont("Helvetica", 9)
+            tx = c.beginText()
+            tx.setFont("Helvetica", 9)
+    c.drawText(tx)
 
     # Key notes
     if y < 2.0 * inch:
@@ -123,4 +157,4 @@ def build_weekly_pdf(profile: dict[str, Any], logs: list[dict[str, Any]]) -> byt
 
     c.showPage()
     c.save()
-    return buf.getvalue()
+    return buf.getvalue() if sink is None else None
@@ -9,23 +9,35 @@ from __future__ import annotations
 from typing import Any
 
 
-def _has(cond_str: str, key: str) -> bool:
-    return key.lower() in (cond_str or "").lower()
-
-
-def compute_daily_risk(day_logs: list[dict[str, Any]], profile: dict[str, Any]) -> dict[str, Any]:
-    sugar = sum(float(l.get("sugar", 0) or 0) for l in day_logs)
-    sodium = sum(float(l.get("sodium", 0) or 0) for l in day_logs)
-    additives = sum(int(l.get("additives_count", 0) or 0) for l in day_logs)
-    nova4 = sum(1 for l in day_logs if int(l.get("nova_group") or 0) == 4)
+def compute_daily_risk(
+    day_logs: list[dict[str, Any]],
+    profile: dict[str, Any],
+    totals: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """``totals``: optional day sums already aggregated in SQL (sugar, sodium,
+    additives_count, nova4_count); when given, day_logs is not re-scanned."""
+    if totals is not None:
+        sugar = float(totals.get("sugar") or 0)
+        sodium = float(totals.get("sodium") or 0)
+        additives = int(totals.get("additives_count") or 0)
+        nova4 = int(totals.get("nova4_count") or 0)
+    else:
+        sugar = sodium = additives = nova4 = 0
+        for l in day_logs:
+            get = l.get
+            sugar += float(get("sugar") or 0)
+            sodium += float(get("sodium") or 0)
+            additives += int(get("additives_count") or 0)
+            nova4 += int(get("nova_group") or 0) == 4
 
-    conditions = profile.get("conditions", "")
+    # Lower-cased once; substring checks so e.g. "type 2 diabetes" still counts.
+    conditions = (profile.get("conditions") or "").lower()
     disease_penalty = 0.0
-    if _has(conditions, "diabetes"):
+    if "diabetes" in conditions:
         disease_penalty += sugar * 0.5
-    if _has(conditions, "hypertension"):
+    if "hypertension" in conditions:
         disease_penalty += sodium * 0.3
-    if _has(conditions, "high_cholesterol"):
+    if "high_cholesterol" in conditions:
         disease_penalty += nova4 * 8
 
     score = sugar * 0.2 + sodium * 0.1 + nova4 * 10 + additives * 2 + disease_penalty
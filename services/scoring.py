@@ -1,8 +1,27 @@
 """Personalized scoring engine for food products."""
 
+from bisect import bisect_right
+
 from services.medical_rules import apply_medical_penalties
 from services.additive_engine import classify_additives, calculate_additive_penalty
 
+# Nutri-Score mapping (both letter cases, so lookups need no normalization)
+_NUTRI_MAP = {
+    'A': 100, 'a': 100,
+    'B': 80, 'b': 80,
+    'C': 60, 'c': 60,
+    'D': 40, 'd': 40,
+    'E': 20, 'e': 20
+}
+
+# NOVA group mapping
+_NOVA_MAP = {
+    1: 100,  # Unprocessed
+    2: 75,   # Processed culinary ingredients
+    3: 50,   # Processed foods
+    4: 20    # Ultra-processed
+}
+
 def compute_base_score(nutri_score, nova_group):
     """
     Compute base score from Nutri-Score and NOVA classification.
@@ -14,25 +33,8 @@ def compute_base_score(nutri_score, nova_group):
     Returns:
         Base score (0-100)
     """
-    # Nutri-Score mapping
-    nutri_map = {
-        'A': 100, 'a': 100,
-        'B': 80, 'b': 80,
-        'C': 60, 'c': 60,
-        'D': 40, 'd': 40,
-        'E': 20, 'e': 20
-    }
-    
-    # NOVA group mapping
-    nova_map = {
-        1: 100,  # Unprocessed
-        2: 75,   # Processed culinary ingredients
-        3: 50,   # Processed foods
-        4: 20    # Ultra-processed
-    }
-    
-    nutrition_score = nutri_map.get(nutri_score, 60)
-    processing_score = nova_map.get(nova_group, 50)
+    nutrition_score = _NUTRI_MAP.get(nutri_score, 60)
+    processing_score = _NOVA_MAP.get(nova_group, 50)
     
     # Weighted average: 60% nutrition, 40% processing
     base = (nutrition_score * 0.6) + (processing_score * 0.4)
@@ -102,6 +104,43 @@ def compute_personalized_score(product, user_profile):
     
     return round(final_score), warnings, recommendation, breakdown
 
+# Recommendation per score band; shared read-only dicts (callers only serialize them).
+_REC_EXCELLENT = {
+    'level': 'excellent',
+    'emoji': '🌟',
+    'title': 'Excellent Choice',
+    'message': 'This product is a great choice with high nutritional value and minimal processing.'
+}
+_REC_GOOD = {
+    'level': 'good',
+    'emoji': '✅',
+    'title': 'Good Choice',
+    'message': 'This is a decent option. Balanced nutrition with acceptable processing levels.'
+}
+_REC_MODERATE = {
+    'level': 'moderate',
+    'emoji': '⚠️',
+    'title': 'Moderate Choice',
+    'message': 'Acceptable nutritionally, but be aware of the warnings for your health profile.'
+}
+_REC_CAUTION = {
+    'level': 'caution',
+    'emoji': '⚠️',
+    'title': 'Use Caution',
+    'message': 'This product has some concerns. Consider healthier alternatives when possible.'
+}
+_REC_AVOID = {
+    'level': 'avoid',
+    'emoji': '❌',
+    'title': 'Not Recommended',
+    'message': 'This product is not recommended based on your health profile. Look for better alternatives.'
+}
+
+# Band lower bounds: below 40, 40-59, 60-79, 80+ (bisect_right gives the band index).
+_SCORE_BANDS = (40, 60, 80)
+_BAND_RECS = (_REC_AVOID, _REC_CAUTION, _REC_GOOD, _REC_EXCELLENT)
+_BAND_COLORS = ('poor', 'moderate', 'good', 'excellent')  # Red, Yellow, Light green, Green
+
 def get_overall_recommendation(score, warnings):
     """
     Generate overall recommendation based on score and warnings.
@@ -113,53 +152,14 @@ def get_overall_recommendation(score, warnings):
     Returns:
         Recommendation dictionary
     """
-    if score >= 80:
-        return {
-            'level': 'excellent',
-            'emoji': '🌟',
-            'title': 'Excellent Choice',
-            'message': 'This product is a great choice with high nutritional value and minimal processing.'
-        }
-    elif score >= 60:
-        if len(warnings) == 0:
-            return {
-                'level': 'good',
-                'emoji': '✅',
-                'title': 'Good Choice',
-                'message': 'This is a decent option. Balanced nutrition with acceptable processing levels.'
-            }
-        else:
-            return {
-                'level': 'moderate',
-                'emoji': '⚠️',
-                'title': 'Moderate Choice',
-                'message': 'Acceptable nutritionally, but be aware of the warnings for your health profile.'
-            }
-    elif score >= 40:
-        return {
-            'level': 'caution',
-            'emoji': '⚠️',
-            'title': 'Use Caution',
-            'message': 'This product has some concerns. Consider healthier alternatives when possible.'
-        }
-    else:
-        return {
-            'level': 'avoid',
-            'emoji': '❌',
-            'title': 'Not Recommended',
-            'message': 'This product is not recommended based on your health profile. Look for better alternatives.'
-        }
+    band = bisect_right(_SCORE_BANDS, score)
+    if band == 2 and warnings:
+        return _REC_MODERATE
+    return _BAND_RECS[band]
 
 def get_score_color(score):
     """Get color class for score display."""
-    if score >= 80:
-        return 'excellent'  # Green
-    elif score >= 60:
-        return 'good'       # Light green
-    elif score >= 40:
-        return 'moderate'   # Yellow
-    else:
-        return 'poor'       # Red
+    return _BAND_COLORS[bisect_right(_SCORE_BANDS, score)]
 
 def compare_products(product1, product2, user_profile):
     """
@@ -11,12 +11,14 @@ from services.who_guidelines import day_guideline_warnings
 
 def simulate_daily(product: dict, user_profile: dict, *, days: int = 30) -> dict:
     # Best-effort serving size
-    serving_g = float(product.get("serving_quantity") or 100)
+    get = product.get
+    serving_g = float(get("serving_quantity") or 100)
     factor = serving_g / 100.0
 
-    kcal = float(product.get("calories") or 0) * factor
-    sugar_g = float(product.get("sugar") or 0) * factor
-    sodium_mg = float(product.get("sodium") or 0) * factor
+    kcal = float(get("calories") or 0) * factor
+    sugar_g = float(get("sugar") or 0) * factor
+    sodium_mg = float(get("sodium") or 0) * factor
+    fiber_g = float(get("fiber") or 0) * factor
 
     total_kcal = kcal * days
     total_sugar = sugar_g * days
@@ -36,8 +38,8 @@ def simulate_daily(product: dict, user_profile: dict, *, days: int = 30) -> dict
     warnings = day_guideline_warnings({
         "sugar": sugar_g,
         "sodium": sodium_mg,
-        "fiber": float(product.get("fiber") or 0) * factor,
-    })
+        "fiber": fiber_g,
+    }, user_profile.get("calorie_target"))
 
     return {
         "days": days,
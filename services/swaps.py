@@ -9,11 +9,30 @@ then ranks candidates by:
 """
 
 from __future__ import annotations
+import heapq
 from services.food_api import search_products
+from services.additive_engine import classify_additives
 from services.scoring import compute_personalized_score
+from services.ttl_cache import TTLCache
 
 _NUTRI_ORDER = {"A":0, "B":1, "C":2, "D":3, "E":4}
 
+# Candidates recur across swap lookups (search results are cached too); the
+# score depends only on the product and the profile's conditions.
+_score_mem = TTLCache(maxsize=2048, ttl=3600)
+
+def _score_key(c: dict, user_profile: dict) -> tuple[str, str]:
+    return (c["barcode"], (user_profile or {}).get("conditions") or "")
+
+def _candidate_score(c: dict, user_profile: dict) -> tuple[int, dict]:
+    key = _score_key(c, user_profile)
+    hit = _score_mem.get(key)
+    if hit is None:
+        score, _warnings, _recommendation, breakdown = compute_personalized_score(c, user_profile)
+        hit = (score, breakdown)
+        _score_mem.set(key, hit)
+    return hit
+
 def _pick_category(categories: str) -> str:
     if not categories:
         return ""
@@ -21,18 +40,38 @@ def _pick_category(categories: str) -> str:
     parts = [p.strip() for p in categories.split(",") if p.strip()]
     return parts[0] if parts else ""
 
+def _swap_rank(x: dict) -> tuple:
+    # Higher score first, then better Nutri-Score, then less sugar and sodium.
+    return (
+        -x["score"],
+        _NUTRI_ORDER.get(str(x.get("nutri_score","C")).upper(), 9),
+        x["sugar"],
+        x["sodium"],
+    )
+
 def find_swaps(product: dict, user_profile: dict, *, limit: int = 3) -> list[dict]:
     cat = _pick_category(product.get("categories",""))
     q = cat or (product.get("name","").split(" ")[0] if product.get("name") else "")
     if not q:
         return []
 
-    candidates = search_products(q, page_size=12)
+    candidates = [
+        c for c in search_products(q, page_size=12)
+        if c.get("barcode") and c.get("barcode") != product.get("barcode")
+    ]
+    # Classify every unscored candidate's additives in one call first: unknown
+    # codes are then enriched (Tavily + LLM) in a single batch and cached,
+    # instead of one enrichment round per candidate during scoring.
+    pending = ",".join(
+        c["additives"] for c in candidates
+        if c.get("additives") and _score_mem.get(_score_key(c, user_profile)) is None
+    )
+    if pending:
+        classify_additives(pending)
+
     swaps = []
     for c in candidates:
-        if not c.get("barcode") or c.get("barcode") == product.get("barcode"):
-            continue
-        score, breakdown = compute_personalized_score(c, user_profile)
+        score, breakdown = _candidate_score(c, user_profile)
         swaps.append({
             "barcode": c.get("barcode"),
             "name": c.get("name"),
@@ -46,10 +85,5 @@ def find_swaps(product: dict, user_profile: dict, *, limit: int = 3) -> list[dic
             "why": breakdown.get("verdict","Better choice") if isinstance(breakdown, dict) else "Better choice",
         })
 
-    swaps.sort(key=lambda x: (
-        -x["score"],
-        _NUTRI_ORDER.get(str(x.get("nutri_score","C")).upper(), 9),
-        x["sugar"],
-        x["sodium"],
-    ))
-    return swaps[:limit]
+    # Only the best `limit` are needed; nsmallest keeps sort's tie order.
+    return heapq.nsmallest(limit, swaps, key=_swap_rank)
@@ -7,7 +7,14 @@ Used to fetch reputable snippets for additive concerns / ingredient questions.
 from __future__ import annotations
 
 import os
+
 import requests
+import orjson
+from requests.adapters import HTTPAdapter
+
+# Keep-alive pool shared by all searches (enrichment runs several in parallel).
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=8))
 
 
 def tavily_search(query: str, *, max_results: int = 5) -> list[dict]:
@@ -26,9 +33,9 @@ def tavily_search(query: str, *, max_results: int = 5) -> list[dict]:
         "include_images": False,
     }
     try:
-        r = requests.post(url, json=payload, timeout=12)
+        r = _SESSION.post(url, json=payload, timeout=12)
         r.raise_for_status()
-        data = r.json() or {}
+        data = orjson.loads(r.content) or {}
         return data.get("results", []) or []
     except Exception:
         return []
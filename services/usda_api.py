@@ -8,10 +8,23 @@ from __future__ import annotations
 
 import os
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from services.ttl_cache import TTLCache
 
 
 FDC_BASE = "https://api.nal.usda.gov/fdc/v1"
 
+# Keep-alive pool for FDC (a name lookup is a search plus a detail fetch);
+# transient 429/5xx on GETs are retried.
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=1,
+    pool_maxsize=8,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504), raise_on_status=False),
+))
+
 
 def _api_key() -> str:
     return os.getenv("FDC_API_KEY", "DEMO_KEY")
@@ -26,7 +39,7 @@ def search_food(query: str, page_size: int = 5) -> list[dict]:
         "pageNumber": 1,
         "requireAllWords": False,
     }
-    r = requests.post(url, params={"api_key": _api_key()}, json=payload, timeout=8)
+    r = _SESSION.post(url, params={"api_key": _api_key()}, json=payload, timeout=8)
     r.raise_for_status()
     data = r.json() or {}
     return data.get("foods", []) or []
@@ -35,13 +48,29 @@ def search_food(query: str, page_size: int = 5) -> list[dict]:
 def get_food(fdc_id: int) -> dict:
     """Fetch full food details."""
     url = f"{FDC_BASE}/food/{fdc_id}"
-    r = requests.get(url, params={"api_key": _api_key()}, timeout=8)
+    r = _SESSION.get(url, params={"api_key": _api_key()}, timeout=8)
     r.raise_for_status()
     return r.json() or {}
 
 
+# Output field -> FDC nutrient names to try, in order.
+_MACRO_NUTRIENTS = (
+    ("calories", ("energy", "energy (kcal)")),
+    ("protein", ("protein",)),
+    ("carbs", ("carbohydrate, by difference", "carbohydrate")),
+    ("fat", ("total lipid (fat)", "fat")),
+    ("sugar", ("sugars, total including nlea", "sugars, total")),
+    ("sodium", ("sodium, na",)),
+)
+_MACRO_NAMES = frozenset(name for _, names in _MACRO_NUTRIENTS for name in names)
+
+# Macros per FDC food: different search names often resolve to the same food,
+# so the (large) detail fetch is skipped for an id seen recently.
+_macros_mem = TTLCache(maxsize=512, ttl=24 * 3600)
+
+
 def extract_macros(food: dict) -> dict:
-    """Extract calories/macros from FDC food details.
+    """Extract calories/macros from FDC food details or a foods/search row.
 
     Returns per 100g approximate values when possible.
     """
@@ -49,17 +78,27 @@ def extract_macros(food: dict) -> dict:
     # FDC nutrient IDs vary by data type; fallback to names.
     by_name = {}
     for n in nutrients:
-        name = (n.get("nutrient") or {}).get("name") or n.get("nutrientName")
+        detail = n.get("nutrient") or {}
+        name = detail.get("name") or n.get("nutrientName")
         if not name:
             continue
-        by_name[name.lower()] = n
+        name = name.lower()
+        # Most of a detail record's ~100 nutrients are micronutrients.
+        if name not in _MACRO_NAMES:
+            continue
+        # Energy can be listed twice (kcal and kJ) under the same name.
+        if (detail.get("unitName") or n.get("unitName") or "").lower() == "kj":
+            continue
+        by_name[name] = n
 
-    def val(keys: list[str]) -> float:
+    def val(keys: tuple[str, ...]) -> float:
         for k in keys:
             n = by_name.get(k)
             if n is None:
                 continue
             v = n.get("amount")
+            if v is None:
+                v = n.get("value")  # search rows
             if v is not None:
                 try:
                     return float(v)
@@ -67,21 +106,8 @@ def extract_macros(food: dict) -> dict:
                     pass
         return 0.0
 
-    calories = val(["energy", "energy (kcal)"])
-    protein = val(["protein"])
-    carbs = val(["carbohydrate, by difference", "carbohydrate"])
-    fat = val(["total lipid (fat)", "fat"])
-    sugar = val(["sugars, total including nlea", "sugars, total"])
-    sodium_mg = val(["sodium, na"])  # often mg
-
-    return {
-        "calories": calories,
-        "protein": protein,
-        "carbs": carbs,
-        "fat": fat,
-        "sugar": sugar,
-        "sodium": sodium_mg,
-    }
+    # sodium is often reported in mg
+    return {field: val(keys) for field, keys in _MACRO_NUTRIENTS}
 
 
 def fallback_nutrition_for_name(name: str) -> dict | None:
@@ -94,6 +120,13 @@ def fallback_nutrition_for_name(name: str) -> dict | None:
     fdc_id = best.get("fdcId")
     if not fdc_id:
         return None
-    detail = get_food(int(fdc_id))
-    macros = extract_macros(detail)
-    return macros
+    fdc_id = int(fdc_id)
+    macros = _macros_mem.get(fdc_id)
+    if macros is None:
+        # Search rows usually carry the nutrients inline; only fetch the full
+        # record when they don't.
+        macros = extract_macros(best)
+        if not macros["calories"]:
+            macros = extract_macros(get_food(fdc_id))
+        _macros_mem.set(fdc_id, macros)
+    return dict(macros)